@@ -0,0 +1,117 @@
+"""
+DateMate context window over a long session
+
+Usage:
+    python benchmarks/context_window.py [--turns 500]
+
+Plays a session against a fake chat model and checks, for every turn, that the prompt stays
+flat and that each earlier turn is either sent verbatim or covered by the rolling summary.
+The fake summarizer records which turns it folded in, so a turn that is neither sent nor
+summarized is detected. Exits with status 1 if a check fails.
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ["DATE_MATE_GREETING_CACHE"] = "false"
+os.environ["DATE_MATE_SESSION_BACKEND"] = "memory"
+# The fake model is not rate limited
+os.environ["LLM_REQUESTS_PER_MINUTE"] = "1000000000"
+os.environ["LLM_TOKENS_PER_MINUTE"] = "1000000000"
+
+from com.mhire.app.config.config import Config
+from com.mhire.app.gateway.llm_gateway import estimate_message_tokens
+from com.mhire.app.services.date_mate.context_window import SUMMARY_PROMPT
+from com.mhire.app.services.date_mate.date_mate_schema import ChatRequest
+
+USER_ID = "benchmark-user"
+SUMMARY_MARKER = SUMMARY_PROMPT.split("\n", 1)[0]
+COVERED = re.compile(r"tours (\d+)-(\d+)")
+
+class FakeChatModel:
+    """Answers chat turns by echoing the turn number; summarizes by recording the range of turns covered"""
+
+    def __init__(self):
+        self.prompts = []
+        self.summary_gaps = 0
+
+    async def ainvoke(self, messages, **kwargs):
+        await asyncio.sleep(0)
+        if messages[0].content.startswith(SUMMARY_MARKER):
+            return types.SimpleNamespace(content=self._summarize(messages[1].content))
+        self.prompts.append(list(messages))
+        turn = re.search(r"u(\d+)", messages[-1].content).group(1)
+        return types.SimpleNamespace(content=f"a{turn}: Je comprends, dis-m'en un peu plus sur ce qui s'est passe.")
+
+    def _summarize(self, prompt: str) -> str:
+        current, exchanges = prompt.split("NOUVEAUX ECHANGES:", 1)
+        covered = COVERED.search(current)
+        first, last = (int(covered.group(1)), int(covered.group(2))) if covered else (0, -1)
+        turns = sorted({int(turn) for turn in re.findall(r"\bu(\d+)", exchanges)})
+        if turns != list(range(last + 1, last + 1 + len(turns))):
+            self.summary_gaps += 1
+            return "tours 0--1"
+        return f"tours {first}-{turns[-1]}"
+
+def missing_turns(prompt, turn: int) -> list:
+    """Earlier turns neither sent verbatim nor covered by the summary"""
+    text = "\n".join(message.content for message in prompt)
+    covered = COVERED.search(text)
+    last_summarized = int(covered.group(2)) if covered else -1
+    return [
+        earlier for earlier in range(last_summarized + 1, turn)
+        if f"u{earlier} " not in text or f"a{earlier}:" not in text
+    ]
+
+async def run(turns: int) -> int:
+    from com.mhire.app.services.date_mate.date_mate import DateMate
+
+    config = Config()
+    date_mate = DateMate(config)
+    model = FakeChatModel()
+    date_mate.llm = model
+    date_mate.context.llm = model
+
+    tokens = []
+    failures = 0
+    for turn in range(turns):
+        await date_mate.chat(ChatRequest(user_id=USER_ID, message=f"u{turn} Mon rendez-vous de ce soir avec Julie me stresse."))
+        # Let background summaries run between turns, as they would between user messages
+        await asyncio.sleep(0)
+        prompt = model.prompts[-1]
+        tokens.append(estimate_message_tokens(prompt))
+        missing = missing_turns(prompt, turn)
+        if missing:
+            failures += 1
+            if failures <= 5:
+                print(f"turn {turn}: turns {missing[0]}..{missing[-1]} missing from the context ({len(missing)} turns)")
+    await date_mate.stop()
+
+    bound = estimate_message_tokens([date_mate.SYSTEM_MESSAGE]) + \
+        (config.date_mate_context_turns + config.date_mate_summary_trigger_turns + 1) * 2 * 40
+    checkpoints = [n for n in (1, 10, 50, 100, 250, 500, turns) if n <= turns]
+    print("prompt tokens at turn " + ", ".join(f"{n}: {tokens[n - 1]}" for n in sorted(set(checkpoints))))
+    print(f"max prompt tokens {max(tokens)} (bound {bound}), summaries {date_mate.context.summaries}")
+    print(f"turns with missing context: {failures}, summary gaps: {model.summary_gaps}")
+
+    ok = failures == 0 and model.summary_gaps == 0 and max(tokens) <= bound
+    # Flat: the second half of the session costs no more than the first
+    half = turns // 2
+    if half:
+        ok = ok and max(tokens[half:]) <= max(tokens[:half])
+    print("OK" if ok else "FAILED")
+    return 0 if ok else 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Check DateMate prompt size and coverage over a long session")
+    parser.add_argument("--turns", type=int, default=500, help="Turns to play")
+    args = parser.parse_args()
+    return asyncio.run(run(args.turns))
+
+if __name__ == "__main__":
+    sys.exit(main())
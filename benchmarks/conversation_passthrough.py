@@ -0,0 +1,96 @@
+"""
+/ai-conversation throughput and CPU per request: passthrough vs decode and re-encode
+
+Usage:
+    python benchmarks/conversation_passthrough.py [--messages 10000] [--requests 50] [--concurrency 8]
+
+Serves GET /api/v1/chats/ai-conversation/{user_id} in-process through the ASGI app, with the
+upstream conversation API answered from memory by an httpx.MockTransport. Runs the same load
+with CONVERSATION_PASSTHROUGH on (raw upstream bytes relayed) and off (the document is decoded
+and re-encoded by FastAPI). Reports requests/sec and process CPU time per request; the
+in-memory upstream costs the same in both modes.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+import httpx
+
+from com.mhire.app.config.config import Config
+from com.mhire.app.services.preferences.upstream_client import UpstreamClient
+
+CHUNK_SIZE = 65536
+
+def synthetic_body(messages: int) -> bytes:
+    return json.dumps({
+        "success": True,
+        "data": {
+            "userInfo": {"name": "Camille", "dob": "1995-04-02", "gender": "FEMALE"},
+            "conversation": [
+                {
+                    "_id": f"{i:024x}",
+                    "userMessage": {"content": f"Message {i}: j'aime les randonnées et les concerts", "createdAt": "2024-01-01T00:00:00Z"},
+                    "aiReply": {"content": "Super ! Qu'est-ce qui vous plaît dans ces sorties ?", "createdAt": "2024-01-01T00:00:01Z"}
+                }
+                for i in range(messages)
+            ]
+        }
+    }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+async def run_mode(app, body: bytes, passthrough: bool, requests: int, concurrency: int):
+    """Returns (requests/sec, CPU milliseconds per request)"""
+    Config().conversation_passthrough = passthrough
+
+    async def chunks():
+        for start in range(0, len(body), CHUNK_SIZE):
+            yield body[start:start + CHUNK_SIZE]
+
+    async def upstream(request: httpx.Request) -> httpx.Response:
+        # A streamed body, as read from the network, so passthrough can relay it chunk by chunk
+        return httpx.Response(200, content=chunks(), headers={"content-type": "application/json"})
+
+    UpstreamClient._client = httpx.AsyncClient(transport=httpx.MockTransport(upstream), base_url="http://upstream.invalid")
+    counter = iter(range(requests))
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=60) as client:
+            async def worker():
+                for i in counter:
+                    # Distinct users, so concurrent fetches are not coalesced
+                    response = await client.get(f"/api/v1/chats/ai-conversation/user-{passthrough}-{i}")
+                    assert response.status_code == 200 and len(response.content) == len(body)
+
+            wall, cpu = time.perf_counter(), time.process_time()
+            await asyncio.gather(*[worker() for _ in range(concurrency)])
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    finally:
+        await UpstreamClient.shutdown()
+    return requests / wall, cpu * 1000 / requests
+
+async def run(messages: int, requests: int, concurrency: int):
+    from com.mhire.app.main import app
+
+    body = synthetic_body(messages)
+    print(f"payload {len(body) / 1e6:.1f} MB, {requests} requests, concurrency {concurrency}")
+    # Warm up both paths once before measuring
+    for passthrough in (False, True):
+        await run_mode(app, body, passthrough, 2, 1)
+    for name, passthrough in (("decode and re-encode", False), ("passthrough", True)):
+        rate, cpu_ms = await run_mode(app, body, passthrough, requests, concurrency)
+        print(f"{name:>20}: {rate:7.1f} req/s, {cpu_ms:7.1f} ms CPU per request")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare /ai-conversation passthrough with decode and re-encode")
+    parser.add_argument("--messages", type=int, default=10000, help="Conversations in the upstream payload")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per mode")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight")
+    args = parser.parse_args()
+    asyncio.run(run(args.messages, args.requests, args.concurrency))
+
+if __name__ == "__main__":
+    main()
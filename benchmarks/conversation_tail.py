@@ -0,0 +1,92 @@
+"""
+Peak memory and latency of parsing a large upstream conversation payload
+
+Usage:
+    python benchmarks/conversation_tail.py [--messages 50000] [--chunk-size 65536]
+
+Builds a synthetic upstream /ai-conversation body and prepares the analysis data from it in
+two ways:
+- json: json.loads of the whole body, then prepare_analysis_data (the former json() path)
+- stream: parse_conversation_tail over the body in chunks, then prepare_analysis_data
+
+Peak allocation is measured with tracemalloc. Latency is measured separately, without tracing.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from com.mhire.app.config.config import Config
+from com.mhire.app.services.preferences.conversation_stream import parse_conversation_tail
+from com.mhire.app.services.preferences.preferences import PreferencesService
+
+USER_ID = "benchmark-user"
+
+def synthetic_body(messages: int) -> bytes:
+    """Upstream payload with the fields the real API returns around each exchange"""
+    return json.dumps({
+        "success": True,
+        "data": {
+            "userInfo": {"name": "Camille", "dob": "1995-04-02", "gender": "FEMALE", "profession": "Architecte"},
+            "conversation": [
+                {
+                    "_id": f"{i:024x}",
+                    "userMessage": {"content": f"Message {i}: j'aime les randonnées et les concerts", "createdAt": f"2024-01-01T00:00:{i % 60:02d}Z"},
+                    "aiReply": {"content": "Super ! Qu'est-ce qui vous plaît dans ces sorties ?", "createdAt": f"2024-01-01T00:00:{i % 60:02d}Z"}
+                }
+                for i in range(messages)
+            ]
+        }
+    }, ensure_ascii=False).encode("utf-8")
+
+def json_path(body: bytes):
+    return PreferencesService.prepare_analysis_data(USER_ID, json.loads(body))
+
+def stream_path(body: bytes, chunk_size: int, tail: int):
+    async def chunks():
+        for start in range(0, len(body), chunk_size):
+            yield body[start:start + chunk_size]
+
+    payload = asyncio.run(parse_conversation_tail(chunks(), tail))
+    return PreferencesService.prepare_analysis_data(USER_ID, payload)
+
+def measure(run):
+    """Returns (traced peak bytes, seconds without tracing, result)"""
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    started = time.perf_counter()
+    result = run()
+    return peak, time.perf_counter() - started, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the json() and streaming parse paths on a large payload")
+    parser.add_argument("--messages", type=int, default=50000, help="Conversations in the payload")
+    parser.add_argument("--chunk-size", type=int, default=65536, help="Bytes per streamed chunk")
+    args = parser.parse_args()
+
+    tail = Config().preference_prompt_max_conversations
+    body = synthetic_body(args.messages)
+    print(f"{args.messages} conversations, {len(body) / 1e6:.1f} MB, tail {tail}")
+
+    results = {}
+    for name, run in (("json", lambda: json_path(body)), ("stream", lambda: stream_path(body, args.chunk_size, tail))):
+        peak, seconds, data = measure(run)
+        results[name] = data
+        print(f"{name:>6}: peak {peak / 1e6:6.1f} MB, {seconds:.3f} s, {len(data.conversation_history)} conversations kept")
+
+    same = results["json"].model_dump() == results["stream"].model_dump()
+    print("analysis data identical" if same else "analysis data DIFFERS")
+    return 0 if same else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
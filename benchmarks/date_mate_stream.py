@@ -0,0 +1,90 @@
+"""
+DateMate time to first byte: POST /date-mate/chat vs POST /date-mate/chat/stream
+
+Usage:
+    python benchmarks/date_mate_stream.py [--chunks 20] [--chunk-delay 0.02] [--runs 5] [--port 8767]
+
+Serves the app with uvicorn on 127.0.0.1 (in a thread) with the chat model replaced by a fake
+one that produces a chunk every --chunk-delay seconds. For each endpoint it measures, over real
+HTTP, the time to the first response byte and to the end of the response. The non-streaming
+endpoint returns nothing until the whole reply is generated; the streaming endpoint should
+deliver its first token after about one chunk delay.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ["DATE_MATE_GREETING_CACHE"] = "false"
+
+import httpx
+import uvicorn
+
+MESSAGE = "J'ai un premier rendez-vous samedi, des idées pour ne pas stresser ?"
+
+class FakeChatModel:
+    """Produces a reply of `chunks` tokens, one every `delay` seconds, streamed or in one piece"""
+
+    def __init__(self, chunks: int, delay: float):
+        self.chunks = chunks
+        self.delay = delay
+
+    async def astream(self, messages, **kwargs):
+        for i in range(self.chunks):
+            await asyncio.sleep(self.delay)
+            yield types.SimpleNamespace(content=f"mot{i} ")
+
+    async def ainvoke(self, messages, **kwargs):
+        await asyncio.sleep(self.chunks * self.delay)
+        return types.SimpleNamespace(content="".join(f"mot{i} " for i in range(self.chunks)))
+
+def start_server(port: int, model: FakeChatModel) -> uvicorn.Server:
+    from com.mhire.app.main import app
+    from com.mhire.app.services.date_mate.date_mate_router import get_date_mate_service
+
+    get_date_mate_service().llm = model
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+def measure(client: httpx.Client, path: str, user_id: str):
+    """Returns (seconds to the first body byte, seconds to the end of the body)"""
+    started = time.perf_counter()
+    first = None
+    with client.stream("POST", path, json={"user_id": user_id, "message": MESSAGE}) as response:
+        response.raise_for_status()
+        for chunk in response.iter_raw():
+            if chunk and first is None:
+                first = time.perf_counter() - started
+    return first, time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare time to first byte of the chat and streaming chat endpoints")
+    parser.add_argument("--chunks", type=int, default=20, help="Tokens in each fake reply")
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="Seconds per token")
+    parser.add_argument("--runs", type=int, default=5, help="Requests per endpoint")
+    parser.add_argument("--port", type=int, default=8767, help="Port for the app")
+    args = parser.parse_args()
+
+    server = start_server(args.port, FakeChatModel(args.chunks, args.chunk_delay))
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.port}", timeout=60) as client:
+            print(f"fake reply: {args.chunks} tokens, {args.chunk_delay * 1000:.0f} ms each")
+            for path in ("/date-mate/chat", "/date-mate/chat/stream"):
+                runs = [measure(client, path, f"benchmark-{path}-{i}") for i in range(args.runs)]
+                first = statistics.median(run[0] for run in runs)
+                total = statistics.median(run[1] for run in runs)
+                print(f"{path:>24}: first byte {first * 1000:6.0f} ms, total {total * 1000:6.0f} ms")
+    finally:
+        server.should_exit = True
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Per-turn message preparation cost in DateMate for sessions of 10, 100 and 1000 messages
+
+Usage:
+    python benchmarks/date_mate_turn.py [--sizes 10 100 1000] [--turns 2000]
+
+Each simulated turn appends a user and an assistant message, converts the session to LangChain
+messages and builds the model context, with no model call. It is timed two ways:
+- incremental: DateMate.langchain_history, which converts only the messages added since the
+  previous turn
+- rebuild: converting every session message on every turn, as before the per-session cache
+The oldest two messages are dropped after each turn, as summarization does, so the session
+stays at its size.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ["DATE_MATE_GREETING_CACHE"] = "false"
+
+from com.mhire.app.config.config import Config
+from com.mhire.app.services.date_mate.date_mate import DateMate
+from com.mhire.app.services.date_mate.date_mate_schema import ChatState
+
+def session(size: int) -> ChatState:
+    state = ChatState(messages=[], context={"recent_topics": []}, user_id="benchmark-user")
+    for i in range(size // 2):
+        state.messages.append({"role": "user", "content": f"Message {i}: mon rendez-vous de samedi me stresse un peu"})
+        state.messages.append({"role": "assistant", "content": "C'est normal ! Qu'est-ce qui vous inquiète le plus ?"})
+    return state
+
+def per_turn_us(date_mate: DateMate, size: int, turns: int, incremental: bool) -> float:
+    state = session(size)
+    date_mate.langchain_history(state)
+    started = time.perf_counter()
+    for i in range(turns):
+        state.messages.append({"role": "user", "content": f"Tour {i}: et pour la tenue ?"})
+        state.messages.append({"role": "assistant", "content": "Restez simple et à l'aise."})
+        if incremental:
+            history = date_mate.langchain_history(state)
+        else:
+            history = DateMate.to_langchain_messages(state.messages)
+        date_mate.context.build(DateMate.SYSTEM_MESSAGE, state, history)
+        state.drop_oldest(2)
+    return (time.perf_counter() - started) / turns * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Time DateMate per-turn message preparation")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Session sizes in messages")
+    parser.add_argument("--turns", type=int, default=2000, help="Turns timed per size")
+    args = parser.parse_args()
+
+    date_mate = DateMate(Config())
+    print(f"{'messages':>8} {'incremental us':>15} {'rebuild us':>11}")
+    for size in args.sizes:
+        incremental = per_turn_us(date_mate, size, args.turns, incremental=True)
+        rebuild = per_turn_us(date_mate, size, args.turns, incremental=False)
+        print(f"{size:>8} {incremental:>15.1f} {rebuild:>11.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Preference prompt construction time for long conversation histories
+
+Usage:
+    python benchmarks/prompt_builder.py [--sizes 100 1000 10000] [--budget 6000] [--repeat 200]
+
+Builds the extraction prompt from synthetic histories of each size with PreferencePromptBuilder.
+The builder normally sees at most PREFERENCE_PROMPT_MAX_CONVERSATIONS (300) conversations, so
+the conversation cap is set to the history size here; otherwise the 1k and 10k cases would
+measure the same 300-conversation slice. The default-cap build and the previous implementation
+(repeated += over the last 100 conversations, no budget) are shown for reference.
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from com.mhire.app.services.preferences.preferences_schema import AnalysisData, ConversationMessage, UserProfile
+from com.mhire.app.services.preferences.prompt_builder import STATIC_INSTRUCTIONS, PreferencePromptBuilder
+
+DEFAULT_MAX_CONVERSATIONS = 300
+
+def synthetic_history(size: int) -> AnalysisData:
+    conversations = [
+        ConversationMessage(
+            user_message=f"Message {i}: je cherche une relation sérieuse avec quelqu'un qui aime voyager et cuisiner",
+            ai_reply="C'est noté ! Qu'est-ce qui compte le plus pour vous chez un partenaire au quotidien ?",
+            timestamp=f"2024-01-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z"
+        )
+        for i in range(size)
+    ]
+    profile = UserProfile(name="Camille", age="1995-04-02", gender="FEMALE", relationship_status="SINGLE", profession="Architecte")
+    return AnalysisData(user_id="benchmark-user", user_profile=profile, conversation_history=conversations, total_conversations=size)
+
+def previous_build(data: AnalysisData) -> str:
+    """Prompt construction before the builder: += over a fixed slice of 100 conversations"""
+    conversation_text = ""
+    conversations_to_analyze = data.conversation_history[-100:]
+    for i, conv in enumerate(conversations_to_analyze):
+        conversation_text += f"\n--- Conversation {i+1} ---\n"
+        conversation_text += f"Utilisateur: {conv.user_message}\n"
+        conversation_text += f"Assistant IA: {conv.ai_reply}\n"
+    return f"{STATIC_INSTRUCTIONS}\nHISTORIQUE DE CONVERSATION ({len(conversations_to_analyze)}):\n{conversation_text}"
+
+def per_call_us(call, repeat: int) -> float:
+    return min(timeit.repeat(call, number=repeat, repeat=3)) / repeat * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Time preference prompt construction for long histories")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="History sizes")
+    parser.add_argument("--budget", type=int, default=6000, help="Prompt token budget")
+    parser.add_argument("--repeat", type=int, default=200, help="Builds per timing")
+    args = parser.parse_args()
+
+    print(f"token budget {args.budget}")
+    print(f"{'history':>8} {'uncapped us':>12} {'included':>9} {'tokens':>7} {'cap 300 us':>11} {'previous us':>12}")
+    for size in args.sizes:
+        data = synthetic_history(size)
+        uncapped = PreferencePromptBuilder(args.budget, max_conversations=size)
+        capped = PreferencePromptBuilder(args.budget, max_conversations=DEFAULT_MAX_CONVERSATIONS)
+        build = uncapped.build(data)
+        print(
+            f"{size:>8} {per_call_us(lambda: uncapped.build(data), args.repeat):>12.1f} "
+            f"{build.conversations_included:>9} {build.estimated_tokens:>7} "
+            f"{per_call_us(lambda: capped.build(data), args.repeat):>11.1f} "
+            f"{per_call_us(lambda: previous_build(data), args.repeat):>12.1f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+API startup cost
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--port 8765]
+
+Measures, in fresh interpreters started from an empty working directory:
+- the time to import com.mhire.app.main
+- the time from launching uvicorn to the first successful GET /health
+
+It also checks that importing the app creates no files in the working directory (databases are
+opened in the lifespan, not at import). The model endpoint points at a closed port, so nothing
+is billed. Exits with status 1 if the import leaves files behind or /health never answers.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEALTH_TIMEOUT = 60
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import com.mhire.app.main; "
+    "print(time.perf_counter() - start)"
+)
+
+def child_env(state_dir: str) -> dict:
+    """Environment with a fake model endpoint and all databases kept in state_dir"""
+    return dict(
+        os.environ,
+        PYTHONPATH=ROOT,
+        OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "sk-benchmark"),
+        OPENAI_ENDPOINT="http://127.0.0.1:9/v1/chat/completions",
+        NOTIFICATION_QUOTE_POOL_HIGH="0",
+        ANALYSIS_JOB_DB_PATH=os.path.join(state_dir, "analysis_jobs.sqlite3"),
+        NOTIFICATION_DB_PATH=os.path.join(state_dir, "notifications.sqlite3"),
+        DATE_MATE_SESSION_DB_PATH=os.path.join(state_dir, "date_mate_sessions.sqlite3"),
+        PREFERENCE_CACHE_PATH=os.path.join(state_dir, "preference_cache.sqlite3")
+    )
+
+def measure_import(workdir: str) -> float:
+    """Seconds to import the app, run with default paths so stray files land in workdir"""
+    env = dict(os.environ, PYTHONPATH=ROOT, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "sk-benchmark"))
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET], cwd=workdir, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+def measure_first_health(workdir: str, state_dir: str, port: int) -> float:
+    """Seconds from launching uvicorn to the first 200 from /health"""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "com.mhire.app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir,
+        env=child_env(state_dir)
+    )
+    try:
+        while time.perf_counter() - start < HEALTH_TIMEOUT:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with status {process.returncode}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f"/health did not answer within {HEALTH_TIMEOUT} s")
+    finally:
+        process.terminate()
+        process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app import time and time to first /health")
+    parser.add_argument("--runs", type=int, default=5, help="Measurements of each kind")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the uvicorn server")
+    args = parser.parse_args()
+
+    imports, healths, stray = [], [], set()
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory() as workdir:
+            imports.append(measure_import(workdir))
+            stray.update(os.listdir(workdir))
+        with tempfile.TemporaryDirectory() as workdir, tempfile.TemporaryDirectory() as state_dir:
+            healths.append(measure_first_health(workdir, state_dir, args.port))
+
+    print(f"import com.mhire.app.main: median {statistics.median(imports):.3f} s, max {max(imports):.3f} s")
+    print(f"time to first /health:     median {statistics.median(healths):.3f} s, max {max(healths):.3f} s")
+    if stray:
+        print(f"FAILED: importing the app created {sorted(stray)}")
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+DateMate topic detection cost with a 1,000-term lexicon
+
+Usage:
+    python benchmarks/topic_detector.py [--terms 1000] [--repeat 2000]
+
+Extends the default FR/EN lexicon with generated French-looking terms up to --terms and times,
+on realistic chat messages of about 200 characters:
+- TopicDetector.detect with the compiled trie regex
+- a naive loop testing every term as a substring of the normalized message
+- TopicDetector.detect with the default lexicon, for reference
+It also reports the one-off cost of compiling the large lexicon.
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from com.mhire.app.services.date_mate.greeting_cache import normalize_message
+from com.mhire.app.services.date_mate.topic_detector import DEFAULT_LEXICON, TopicDetector
+
+MESSAGES = [
+    "Salut ! J'ai enfin un premier rendez-vous samedi soir avec une fille rencontrée sur Hinge, on doit aller "
+    "boire un verre dans un petit bar à Montmartre. Je stresse un peu, tu aurais des conseils pour la conversation ?",
+    "Mon ex m'a envoyé un message hier après trois mois de silence, je ne sais pas si je dois répondre. "
+    "Une partie de moi a encore des sentiments mais je ne veux pas retomber dans une relation compliquée.",
+    "Je trouve que mon profil ne marche pas du tout, j'ai très peu de matchs. Tu pourrais m'aider à réécrire "
+    "ma bio et me dire quelles photos mettre en avant ? J'aime la randonnée, la cuisine et les voyages.",
+    "Honestly I'm a bit nervous, we've been texting for two weeks and she suggested dinner at a restaurant "
+    "near her place. What should I wear, and is it weird if I bring flowers on a first date like this?",
+    "On est ensemble depuis deux ans et il commence à parler de mariage et d'enfants. Moi je l'aime mais "
+    "je ne me sens pas prête, comment aborder le sujet sans le blesser ni mettre notre couple en danger ?",
+]
+
+SYLLABLES = ["ba", "cha", "de", "fleu", "gri", "jo", "la", "mi", "no", "pa", "rou", "si", "ta", "vel", "zou"]
+
+def large_lexicon(terms: int) -> dict:
+    """Default lexicon plus generated terms spread over the same topics"""
+    lexicon = {topic: list(words) for topic, words in DEFAULT_LEXICON.items()}
+    existing = sum(len(words) for words in lexicon.values())
+    topics = itertools.cycle(lexicon)
+    generated = ("".join(parts) for parts in itertools.product(SYLLABLES, repeat=3))
+    for _ in range(max(0, terms - existing)):
+        lexicon[next(topics)].append(next(generated))
+    return lexicon
+
+class SubstringDetector:
+    """Naive alternative: test every normalized term against the normalized message"""
+
+    def __init__(self, lexicon: dict):
+        self.terms = [(normalize_message(term), topic) for topic, words in lexicon.items() for term in words]
+
+    def detect(self, message: str) -> list:
+        text = normalize_message(message)
+        topics = []
+        for term, topic in self.terms:
+            if term in text and topic not in topics:
+                topics.append(topic)
+        return topics
+
+def per_message_us(detector, repeat: int) -> float:
+    def run():
+        for message in MESSAGES:
+            detector.detect(message)
+    return min(timeit.repeat(run, number=repeat, repeat=3)) / (repeat * len(MESSAGES)) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Time topic detection with a large lexicon")
+    parser.add_argument("--terms", type=int, default=1000, help="Terms in the large lexicon")
+    parser.add_argument("--repeat", type=int, default=2000, help="Passes over the sample messages per timing")
+    args = parser.parse_args()
+
+    lexicon = large_lexicon(args.terms)
+    started = time.perf_counter()
+    large = TopicDetector(lexicon)
+    compile_ms = (time.perf_counter() - started) * 1000
+    default = TopicDetector(DEFAULT_LEXICON)
+
+    print(f"messages of {sum(map(len, MESSAGES)) // len(MESSAGES)} characters on average")
+    print(f"trie regex, {large.term_count} terms: {per_message_us(large, args.repeat):7.1f} us per message "
+          f"(compiled in {compile_ms:.0f} ms)")
+    print(f"substring loop, {large.term_count} terms: {per_message_us(SubstringDetector(lexicon), args.repeat):7.1f} us per message")
+    print(f"trie regex, default {default.term_count} terms: {per_message_us(default, args.repeat):7.1f} us per message")
+    for message in MESSAGES[:2]:
+        print(f"  {large.detect(message)} <- {message[:50]}...")
+
+if __name__ == "__main__":
+    main()
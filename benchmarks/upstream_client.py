@@ -0,0 +1,108 @@
+"""
+Upstream conversation API throughput: shared pooled client vs a client per request
+
+Usage:
+    python benchmarks/upstream_client.py [--requests 500] [--concurrency 50] [--port 8766]
+
+Starts a local stand-in for the upstream conversation API (uvicorn on 127.0.0.1, in a
+thread) and fetches conversations through PreferencesService with the application-scoped
+UpstreamClient. For comparison it makes the same requests the way the service used to,
+opening a new httpx.AsyncClient (and so a new TCP connection) for every request. Prints
+requests/sec for both.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+CONVERSATIONS = 20
+
+def stand_in_app() -> FastAPI:
+    """Upstream stand-in answering every user with the same small conversation history"""
+    app = FastAPI()
+    payload = {
+        "success": True,
+        "data": {
+            "userInfo": {"name": "Camille", "age": 29},
+            "conversation": [
+                {"role": "user", "content": f"Message {i}: j'aime les randonnees et les concerts", "timestamp": "2026-01-01T10:00:00"}
+                for i in range(CONVERSATIONS)
+            ]
+        }
+    }
+
+    @app.get("/api/v1/chats/ai-conversation/{user_id}")
+    async def conversation(user_id: str):
+        return payload
+
+    return app
+
+def start_server(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(stand_in_app(), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+async def drive(fetch, requests: int, concurrency: int) -> float:
+    """Run requests fetches, concurrency at a time; returns requests/sec"""
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            await fetch(f"user-{i}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return requests / (time.perf_counter() - start)
+
+async def run(requests: int, concurrency: int, base: str):
+    from com.mhire.app.config.config import Config
+    from com.mhire.app.services.preferences.preferences import PreferencesService
+    from com.mhire.app.services.preferences.upstream_client import UpstreamClient
+
+    async def client_per_request(user_id: str):
+        # The previous implementation: a fresh client and connection for each request
+        async with httpx.AsyncClient() as client:
+            response = await client.get(f"{base}/api/v1/chats/ai-conversation/{user_id}")
+            response.raise_for_status()
+            return response.json()
+
+    before = await drive(client_per_request, requests, concurrency)
+
+    await UpstreamClient.startup(Config())
+    try:
+        after = await drive(PreferencesService.fetch_user_conversations, requests, concurrency)
+    finally:
+        await UpstreamClient.shutdown()
+
+    print(f"{requests} requests, concurrency {concurrency}")
+    print(f"client per request:   {before:6.0f} req/s")
+    print(f"shared pooled client: {after:6.0f} req/s ({after / before:.1f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare upstream fetch throughput with and without the shared client")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per mode")
+    parser.add_argument("--concurrency", type=int, default=50, help="Requests in flight")
+    parser.add_argument("--port", type=int, default=8766, help="Port for the upstream stand-in")
+    args = parser.parse_args()
+
+    base = f"http://127.0.0.1:{args.port}"
+    os.environ["UPSTREAM_API_BASE"] = base
+    server = start_server(args.port)
+    try:
+        asyncio.run(run(args.requests, args.concurrency, base))
+    finally:
+        server.should_exit = True
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Bulk preference analysis from the command line
+
+Usage:
+    python -m com.mhire.app.batch_analyze USER_ID [USER_ID ...]
+    python -m com.mhire.app.batch_analyze --file user_ids.txt --concurrency 16 > results.ndjson
+
+Writes one NDJSON line per user as soon as it is ready, followed by a summary line.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from com.mhire.app.config.config import Config
+from com.mhire.app.gateway.llm_gateway import llm_gateway
+from com.mhire.app.services.preferences.upstream_client import UpstreamClient
+from com.mhire.app.services.preferences.batch_analysis import run_batch
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Analyze user preferences in bulk and stream NDJSON results")
+    parser.add_argument("user_ids", nargs="*", help="User IDs to analyze")
+    parser.add_argument("--file", help="File with one user ID per line ('-' for stdin)")
+    parser.add_argument("--concurrency", type=int, default=None, help="Users analyzed at once")
+    parser.add_argument("--refresh", action="store_true", help="Bypass the result cache")
+    parser.add_argument("--full", action="store_true", help="Force a full (non-incremental) re-analysis")
+    return parser.parse_args()
+
+def read_user_ids(args) -> list:
+    user_ids = list(args.user_ids)
+    if args.file:
+        stream = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+        with stream:
+            user_ids.extend(line.strip() for line in stream if line.strip())
+    return user_ids
+
+async def main():
+    args = parse_args()
+    user_ids = read_user_ids(args)
+    if not user_ids:
+        print("No user IDs given", file=sys.stderr)
+        return 1
+
+    config = Config()
+    # Same cap as the HTTP batch endpoint
+    concurrency = min(args.concurrency or config.batch_analyze_concurrency, config.batch_analyze_max_concurrency)
+    await UpstreamClient.startup(config)
+    try:
+        async for record in run_batch(user_ids, concurrency, refresh=args.refresh, full=args.full):
+            sys.stdout.write(json.dumps(record, ensure_ascii=False) + "\n")
+            sys.stdout.flush()
+    finally:
+        await UpstreamClient.shutdown()
+        await llm_gateway.aclose()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,6 +1,6 @@
 import os
 from dotenv import load_dotenv
-            
+
 load_dotenv()
 
 class Config:
@@ -12,4 +12,85 @@ class Config:
             cls._instance.openai_api_key = os.getenv("OPENAI_API_KEY")
             cls._instance.openai_model = os.getenv("OPENAI_MODEL", "gpt-4-turbo")
             cls._instance.openai_endpoint = os.getenv("OPENAI_ENDPOINT")
-        return cls._instance
\ No newline at end of file
+
+            # Upstream conversation API (shared pooled HTTP client)
+            cls._instance.upstream_api_base = os.getenv("UPSTREAM_API_BASE", "http://168.231.82.17:5000")
+            cls._instance.upstream_max_connections = int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100"))
+            cls._instance.upstream_max_keepalive_connections = int(os.getenv("UPSTREAM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+            cls._instance.upstream_keepalive_expiry = float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30"))
+            cls._instance.upstream_connect_timeout = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "5"))
+            cls._instance.upstream_read_timeout = float(os.getenv("UPSTREAM_READ_TIMEOUT", "30"))
+            cls._instance.upstream_http2 = os.getenv("UPSTREAM_HTTP2", "false").lower() == "true"
+            cls._instance.conversation_passthrough = os.getenv("CONVERSATION_PASSTHROUGH", "true").lower() == "true"
+
+            # LLM gateway shared by all services (pooled client, limits and retries)
+            cls._instance.llm_max_connections = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+            cls._instance.llm_max_keepalive_connections = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+            cls._instance.llm_keepalive_expiry = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+            cls._instance.llm_connect_timeout = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+            cls._instance.llm_read_timeout = float(os.getenv("LLM_READ_TIMEOUT", "120"))
+            cls._instance.llm_max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+            cls._instance.llm_preferences_concurrency = int(os.getenv("LLM_PREFERENCES_CONCURRENCY", "8"))
+            cls._instance.llm_date_mate_concurrency = int(os.getenv("LLM_DATE_MATE_CONCURRENCY", os.getenv("DATE_MATE_MAX_CONCURRENT_LLM", "16")))
+            cls._instance.llm_notification_concurrency = int(os.getenv("LLM_NOTIFICATION_CONCURRENCY", "2"))
+            # Global slots kept free for each service, so one service's burst cannot starve the others
+            cls._instance.llm_reserved_slots = int(os.getenv("LLM_RESERVED_SLOTS", "2"))
+            cls._instance.llm_requests_per_minute = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+            cls._instance.llm_tokens_per_minute = float(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+            cls._instance.llm_max_retries = int(os.getenv("LLM_MAX_RETRIES", "3"))
+            cls._instance.llm_backoff_base = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+            cls._instance.llm_backoff_max = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+            # LLM admission control: calls waiting per priority class before callers get a 503
+            cls._instance.llm_interactive_queue_limit = int(os.getenv("LLM_INTERACTIVE_QUEUE_LIMIT", "64"))
+            cls._instance.llm_analysis_queue_limit = int(os.getenv("LLM_ANALYSIS_QUEUE_LIMIT", "32"))
+            cls._instance.llm_background_queue_limit = int(os.getenv("LLM_BACKGROUND_QUEUE_LIMIT", "16"))
+
+            # Preference analysis result cache
+            cls._instance.preference_cache_backend = os.getenv("PREFERENCE_CACHE_BACKEND", "memory").lower()
+            cls._instance.preference_cache_path = os.getenv("PREFERENCE_CACHE_PATH", "preference_cache.sqlite3")
+            cls._instance.preference_cache_max_size = int(os.getenv("PREFERENCE_CACHE_MAX_SIZE", "10000"))
+            cls._instance.preference_cache_ttl = float(os.getenv("PREFERENCE_CACHE_TTL", "86400"))
+            cls._instance.preference_incremental = os.getenv("PREFERENCE_INCREMENTAL", "true").lower() == "true"
+
+            # Preference extraction prompt size
+            cls._instance.preference_prompt_token_budget = int(os.getenv("PREFERENCE_PROMPT_TOKEN_BUDGET", "6000"))
+            cls._instance.preference_prompt_max_conversations = int(os.getenv("PREFERENCE_PROMPT_MAX_CONVERSATIONS", "300"))
+
+            # Batch preference analysis
+            cls._instance.batch_analyze_concurrency = int(os.getenv("BATCH_ANALYZE_CONCURRENCY", "8"))
+            cls._instance.batch_analyze_max_concurrency = int(os.getenv("BATCH_ANALYZE_MAX_CONCURRENCY", "32"))
+
+            # Asynchronous analysis jobs
+            cls._instance.analysis_job_db_path = os.getenv("ANALYSIS_JOB_DB_PATH", "analysis_jobs.sqlite3")
+            cls._instance.analysis_job_workers = int(os.getenv("ANALYSIS_JOB_WORKERS", "4"))
+            cls._instance.analysis_job_retention = float(os.getenv("ANALYSIS_JOB_RETENTION", "604800"))
+            cls._instance.analysis_job_lease_ttl = float(os.getenv("ANALYSIS_JOB_LEASE_TTL", "60"))
+            # Comma-separated hosts that job callbacks may be sent to; empty allows any http(s) host
+            cls._instance.analysis_job_callback_hosts = [
+                host.strip().lower() for host in os.getenv("ANALYSIS_JOB_CALLBACK_HOSTS", "").split(",") if host.strip()
+            ]
+
+            # Notification quotes
+            cls._instance.notification_db_path = os.getenv("NOTIFICATION_DB_PATH", "notifications.sqlite3")
+            cls._instance.notification_quote_history = int(os.getenv("NOTIFICATION_QUOTE_HISTORY", "30"))
+            cls._instance.notification_cache_max_age = int(os.getenv("NOTIFICATION_CACHE_MAX_AGE", "300"))
+            cls._instance.notification_lease_ttl = float(os.getenv("NOTIFICATION_LEASE_TTL", "300"))
+            cls._instance.notification_quote_pool_low = int(os.getenv("NOTIFICATION_QUOTE_POOL_LOW", "5"))
+            cls._instance.notification_quote_pool_high = int(os.getenv("NOTIFICATION_QUOTE_POOL_HIGH", "20"))
+            cls._instance.notification_quote_batch_size = int(os.getenv("NOTIFICATION_QUOTE_BATCH_SIZE", "5"))
+
+            # Date Mate chat
+            cls._instance.date_mate_turn_lock_timeout = float(os.getenv("DATE_MATE_TURN_LOCK_TIMEOUT", "30"))
+            cls._instance.date_mate_context_turns = int(os.getenv("DATE_MATE_CONTEXT_TURNS", "6"))
+            cls._instance.date_mate_summary_trigger_turns = int(os.getenv("DATE_MATE_SUMMARY_TRIGGER_TURNS", "10"))
+            cls._instance.date_mate_summary_max_tokens = int(os.getenv("DATE_MATE_SUMMARY_MAX_TOKENS", "300"))
+            cls._instance.date_mate_topic_lexicon = os.getenv("DATE_MATE_TOPIC_LEXICON", "")
+            cls._instance.date_mate_greeting_cache = os.getenv("DATE_MATE_GREETING_CACHE", "true").lower() == "true"
+            cls._instance.date_mate_greeting_pool_size = int(os.getenv("DATE_MATE_GREETING_POOL_SIZE", "5"))
+            cls._instance.date_mate_greeting_refresh_interval = float(os.getenv("DATE_MATE_GREETING_REFRESH_INTERVAL", "3600"))
+            cls._instance.date_mate_session_backend = os.getenv("DATE_MATE_SESSION_BACKEND", "memory").lower()
+            cls._instance.date_mate_session_db_path = os.getenv("DATE_MATE_SESSION_DB_PATH", "date_mate_sessions.sqlite3")
+            cls._instance.date_mate_max_sessions = int(os.getenv("DATE_MATE_MAX_SESSIONS", "10000"))
+            cls._instance.date_mate_session_idle_ttl = float(os.getenv("DATE_MATE_SESSION_IDLE_TTL", "86400"))
+            cls._instance.date_mate_session_max_bytes = int(os.getenv("DATE_MATE_SESSION_MAX_BYTES", "268435456"))
+        return cls._instance
@@ -0,0 +1,455 @@
+import asyncio
+import bisect
+import itertools
+import math
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+import httpx
+from com.mhire.app.config.config import Config
+
+T = TypeVar("T")
+
+# Services that call the model, each with its own concurrency limit
+PREFERENCES = "preferences"
+DATE_MATE = "date_mate"
+NOTIFICATION = "notification"
+
+# Priority classes, highest first: free capacity always goes to the highest class waiting
+INTERACTIVE = "interactive"
+ANALYSIS = "analysis"
+BACKGROUND = "background"
+PRIORITY_CLASSES = (INTERACTIVE, ANALYSIS, BACKGROUND)
+
+# Class of a call when the caller did not set one with request_class()
+SERVICE_CLASSES = {DATE_MATE: INTERACTIVE, PREFERENCES: ANALYSIS, NOTIFICATION: BACKGROUND}
+
+# Bounds of the Retry-After suggested to rejected callers, in seconds
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+
+_request_class: ContextVar[Optional[str]] = ContextVar("llm_request_class", default=None)
+_request_waits: ContextVar[bool] = ContextVar("llm_request_waits", default=False)
+
+# Average characters per token for mixed French/English text
+CHARS_PER_TOKEN = 4
+
+# Per-message framing overhead added by the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUSES = {408, 409, 429}
+
+# Client-side errors from the SDKs that carry no HTTP response
+RETRYABLE_ERRORS = {"APIConnectionError", "APITimeoutError"}
+
+def estimate_message_tokens(messages: Iterable) -> int:
+    """
+    Cheap token estimate for chat messages, without a tokenizer
+
+    Args:
+        messages: Dicts with a "content" key or LangChain message objects
+
+    Returns:
+        int: Estimated prompt tokens
+    """
+    tokens = 0
+    for message in messages:
+        content = message["content"] if isinstance(message, dict) else message.content
+        tokens += MESSAGE_OVERHEAD_TOKENS + (len(content) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return tokens
+
+@contextmanager
+def request_class(name: str, wait: bool = False) -> Iterator[None]:
+    """
+    Run the model calls made in this block (and in tasks it starts) in the given priority class
+
+    Args:
+        name: Priority class (INTERACTIVE, ANALYSIS or BACKGROUND)
+        wait: Queue for capacity even when the class's queue is full, instead of failing fast with
+            LLMOverloaded; for batch and job workers, which have no client waiting on a 503
+    """
+    class_token = _request_class.set(name)
+    wait_token = _request_waits.set(wait)
+    try:
+        yield
+    finally:
+        _request_waits.reset(wait_token)
+        _request_class.reset(class_token)
+
+def request_options() -> Tuple[Optional[str], bool]:
+    """Priority class and wait mode set with request_class() for the current context"""
+    return _request_class.get(), _request_waits.get()
+
+class LLMOverloaded(Exception):
+    """A priority class has too many calls waiting; the caller should retry after retry_after seconds"""
+
+    def __init__(self, request_class: str, retry_after: int):
+        super().__init__(f"Too many pending {request_class} model calls, retry in {retry_after}s")
+        self.request_class = request_class
+        self.retry_after = retry_after
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate, served in priority order"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self._tokens = per_minute
+        self._updated = time.monotonic()
+        # One caller at a time waits for the refill; the next turn goes to the most urgent caller
+        self._gate = PriorityGate(1)
+        self._sleeper: Optional[Tuple[int, asyncio.Event]] = None
+        self.waited_seconds = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, amount: float, priority: int = 0):
+        """Wait until amount tokens are available and take them; lower priority values are served first"""
+        # A single request larger than the bucket may still run once the bucket is full
+        amount = min(amount, self.capacity)
+        while True:
+            # A less urgent caller waiting for the refill gives way to this one
+            if self._sleeper is not None and priority < self._sleeper[0]:
+                self._sleeper[1].set()
+            await self._gate.acquire(priority)
+            try:
+                while True:
+                    self._refill()
+                    if self._tokens >= amount:
+                        self._tokens -= amount
+                        return
+                    if not await self._wait_for_refill(amount, priority):
+                        break
+            finally:
+                self._gate.release()
+
+    async def _wait_for_refill(self, amount: float, priority: int) -> bool:
+        """Sleep until amount tokens should be available; False if a more urgent caller took the turn"""
+        preempted = asyncio.Event()
+        self._sleeper = (priority, preempted)
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(preempted.wait(), (amount - self._tokens) / self.rate)
+            return False
+        except asyncio.TimeoutError:
+            return True
+        finally:
+            self._sleeper = None
+            self.waited_seconds += time.monotonic() - started
+
+    def available(self) -> float:
+        self._refill()
+        return self._tokens
+
+class PriorityGate:
+    """
+    Concurrency limit that hands each freed slot to the highest-priority waiter, FIFO within a priority
+
+    Slots can be reserved per key (e.g. per service): a key holding fewer slots than its reservation
+    can always get one, and other keys only take slots that leave the unused reservations free.
+    """
+
+    def __init__(self, limit: int, reserved: Optional[Dict[str, int]] = None):
+        self.limit = limit
+        self.in_use = 0
+        self.reserved = dict(reserved or {})
+        self._held: Dict[Optional[str], int] = {}
+        # Sorted by (priority, arrival order)
+        self._waiters: List[Tuple[int, int, Optional[str], asyncio.Future]] = []
+        self._order = itertools.count()
+
+    def _admissible(self, key: Optional[str]) -> bool:
+        if self.in_use >= self.limit:
+            return False
+        if self._held.get(key, 0) < self.reserved.get(key, 0):
+            return True
+        unused = sum(
+            max(0, reserve - self._held.get(other, 0)) for other, reserve in self.reserved.items() if other != key
+        )
+        return self.limit - self.in_use - 1 >= unused
+
+    def _dispatch(self):
+        """Grant free slots to waiters in priority order, skipping those whose grant would break a reservation"""
+        index = 0
+        while index < len(self._waiters) and self.in_use < self.limit:
+            _, _, key, waiter = self._waiters[index]
+            if waiter.done():
+                # Cancelled while waiting
+                del self._waiters[index]
+            elif self._admissible(key):
+                del self._waiters[index]
+                self.in_use += 1
+                self._held[key] = self._held.get(key, 0) + 1
+                waiter.set_result(None)
+            else:
+                index += 1
+
+    async def acquire(self, priority: int, key: Optional[str] = None):
+        waiter = asyncio.get_running_loop().create_future()
+        bisect.insort(self._waiters, (priority, next(self._order), key, waiter))
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # A slot handed over just as the caller was cancelled is passed on
+            if waiter.done() and not waiter.cancelled():
+                self.release(key)
+            raise
+
+    def release(self, key: Optional[str] = None):
+        self.in_use -= 1
+        self._held[key] -= 1
+        self._dispatch()
+
+    def waiting(self) -> int:
+        return sum(1 for _, _, _, waiter in self._waiters if not waiter.done())
+
+class LLMGateway:
+    """
+    Single path to the model for every service
+
+    Requests share one pooled HTTP client and pass a global and a per-service concurrency
+    limit plus request/min and token/min buckets, so a burst on one endpoint cannot use up
+    the capacity or the provider rate limit of the others. A few global slots are reserved for
+    each service, so even a service at its own cap leaves the others room to run. Failed calls are retried with
+    jittered exponential backoff that honors Retry-After.
+
+    Every call belongs to a priority class (interactive chat, on-demand analysis, batch and
+    background work). Service slots, rate-limit tokens and global slots all go to the highest
+    class waiting, and a class whose queue is full rejects new calls at once with
+    LLMOverloaded instead of letting them pile up.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self._client: Optional[httpx.AsyncClient] = None
+        limits = {
+            PREFERENCES: config.llm_preferences_concurrency,
+            DATE_MATE: config.llm_date_mate_concurrency,
+            NOTIFICATION: config.llm_notification_concurrency,
+        }
+        # Never reserve more than an even share of the global limit
+        reserve = max(0, min(config.llm_reserved_slots, config.llm_max_concurrency // len(limits)))
+        self.reserved_slots = {service: min(reserve, limit) for service, limit in limits.items()}
+        self._global = PriorityGate(config.llm_max_concurrency, self.reserved_slots)
+        self._services: Dict[str, PriorityGate] = {service: PriorityGate(limit) for service, limit in limits.items()}
+        self.requests_bucket = TokenBucket(config.llm_requests_per_minute)
+        self.tokens_bucket = TokenBucket(config.llm_tokens_per_minute)
+        self.max_retries = config.llm_max_retries
+        self.backoff_base = config.llm_backoff_base
+        self.backoff_max = config.llm_backoff_max
+        self._stats = {
+            service: {"requests": 0, "retries": 0, "failures": 0, "in_flight": 0}
+            for service in self._services
+        }
+        self._queue_limits = {
+            INTERACTIVE: config.llm_interactive_queue_limit,
+            ANALYSIS: config.llm_analysis_queue_limit,
+            BACKGROUND: config.llm_background_queue_limit,
+        }
+        self._classes = {
+            name: {"queued": 0, "max_queued": 0, "in_flight": 0, "admitted": 0, "rejected": 0, "over_limit": 0, "wait_seconds": 0.0}
+            for name in PRIORITY_CLASSES
+        }
+        # Moving average of how long a call holds its slot, used to suggest a Retry-After
+        self._call_seconds = 1.0
+
+    def http_client(self) -> httpx.AsyncClient:
+        """Shared pooled HTTP client, for the OpenAI SDK, LangChain and raw requests alike"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.config.llm_max_connections,
+                    max_keepalive_connections=self.config.llm_max_keepalive_connections,
+                    keepalive_expiry=self.config.llm_keepalive_expiry
+                ),
+                timeout=httpx.Timeout(self.config.llm_read_timeout, connect=self.config.llm_connect_timeout)
+            )
+        return self._client
+
+    async def aclose(self):
+        """Close the shared client (called from the FastAPI lifespan)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def request_class(service: str) -> str:
+        """Priority class of a call from service in the current context"""
+        return _request_class.get() or SERVICE_CLASSES[service]
+
+    def check_admission(self, service: str) -> str:
+        """
+        Reject a call up front when its class's queue is full, unless the caller chose to wait
+
+        Args:
+            service: Calling service (PREFERENCES, DATE_MATE or NOTIFICATION)
+
+        Returns:
+            str: The call's priority class
+
+        Raises:
+            LLMOverloaded: The class already has its limit of calls waiting
+        """
+        name = self.request_class(service)
+        counters = self._classes[name]
+        if counters["queued"] >= self._queue_limits[name]:
+            if _request_waits.get():
+                # Batch and job workers queue anyway; their own concurrency bounds the queue
+                counters["over_limit"] += 1
+                return name
+            counters["rejected"] += 1
+            raise LLMOverloaded(name, self._retry_after(counters["queued"]))
+        return name
+
+    def _retry_after(self, queued: int) -> int:
+        # Time for the slots to work through the queue ahead of a retried call
+        estimate = math.ceil(self._call_seconds * (queued + 1) / self._global.limit)
+        return max(MIN_RETRY_AFTER, min(MAX_RETRY_AFTER, estimate))
+
+    @asynccontextmanager
+    async def slot(self, service: str, tokens: int) -> AsyncIterator[None]:
+        """
+        Hold capacity for one model call, e.g. a streamed completion; no retries
+
+        Args:
+            service: Calling service (PREFERENCES, DATE_MATE or NOTIFICATION)
+            tokens: Estimated prompt plus completion tokens
+
+        Raises:
+            LLMOverloaded: The call's priority class has its limit of calls waiting
+        """
+        name = self.check_admission(service)
+        priority = PRIORITY_CLASSES.index(name)
+        counters = self._classes[name]
+        stats = self._stats[service]
+        service_limit = self._services[service]
+        counters["queued"] += 1
+        counters["max_queued"] = max(counters["max_queued"], counters["queued"])
+        queued_at = time.monotonic()
+        try:
+            await service_limit.acquire(priority)
+            try:
+                # Rate limits are waited out before taking a global slot, so other services keep theirs
+                await self.requests_bucket.acquire(1, priority)
+                await self.tokens_bucket.acquire(tokens, priority)
+                await self._global.acquire(priority, service)
+            except BaseException:
+                service_limit.release()
+                raise
+        finally:
+            counters["queued"] -= 1
+        started = time.monotonic()
+        counters["admitted"] += 1
+        counters["wait_seconds"] += started - queued_at
+        counters["in_flight"] += 1
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        try:
+            yield
+        finally:
+            stats["in_flight"] -= 1
+            counters["in_flight"] -= 1
+            self._call_seconds = 0.9 * self._call_seconds + 0.1 * (time.monotonic() - started)
+            self._global.release(service)
+            service_limit.release()
+
+    async def run(self, service: str, call: Callable[[], Awaitable[T]], tokens: int) -> T:
+        """
+        Run a model call within the limits, retrying transient failures
+
+        Args:
+            service: Calling service (PREFERENCES, DATE_MATE or NOTIFICATION)
+            call: Zero-argument coroutine function making one request
+            tokens: Estimated prompt plus completion tokens
+
+        Returns:
+            The call's result
+
+        Raises:
+            LLMOverloaded: The call's priority class has its limit of calls waiting
+            Exception: The last error once retries are exhausted, or any non-retryable error
+        """
+        attempt = 0
+        while True:
+            try:
+                async with self.slot(service, tokens):
+                    return await call()
+            except LLMOverloaded:
+                raise
+            except Exception as e:
+                if attempt >= self.max_retries or not self._retryable(e):
+                    self._stats[service]["failures"] += 1
+                    raise
+                # Back off outside the slot so waiting does not hold capacity
+                delay = self._backoff(attempt, e)
+                attempt += 1
+                self._stats[service]["retries"] += 1
+                print(f"LLM call for {service} failed ({e}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _response(error: Exception) -> Optional[httpx.Response]:
+        # httpx.HTTPStatusError and the OpenAI SDK's APIStatusError both carry the response
+        response = getattr(error, "response", None)
+        return response if isinstance(response, httpx.Response) else None
+
+    def _retryable(self, error: Exception) -> bool:
+        response = self._response(error)
+        if response is not None:
+            return response.status_code in RETRYABLE_STATUSES or response.status_code >= 500
+        return isinstance(error, httpx.TransportError) or type(error).__name__ in RETRYABLE_ERRORS
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        # Full jitter spreads out retries from calls that failed together
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        response = self._response(error)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                wait = float(retry_after)
+            except ValueError:
+                try:
+                    wait = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    wait = 0.0
+            delay = max(delay, min(wait, self.backoff_max))
+        return delay
+
+    def stats(self) -> dict:
+        classes = {}
+        for name, counters in self._classes.items():
+            classes[name] = {
+                "queued": counters["queued"],
+                "max_queued": counters["max_queued"],
+                "queue_limit": self._queue_limits[name],
+                "in_flight": counters["in_flight"],
+                "admitted": counters["admitted"],
+                "rejected": counters["rejected"],
+                "over_limit": counters["over_limit"],
+                "avg_wait_seconds": round(counters["wait_seconds"] / counters["admitted"], 3) if counters["admitted"] else 0.0
+            }
+        return {
+            "services": {service: dict(stats) for service, stats in self._stats.items()},
+            "classes": classes,
+            "max_concurrency": self._global.limit,
+            "reserved_slots": dict(self.reserved_slots),
+            "in_use": self._global.in_use,
+            "waiting_for_slot": self._global.waiting(),
+            "avg_call_seconds": round(self._call_seconds, 3),
+            "requests_per_minute": self.requests_bucket.capacity,
+            "tokens_per_minute": self.tokens_bucket.capacity,
+            "requests_available": round(self.requests_bucket.available(), 1),
+            "tokens_available": round(self.tokens_bucket.available(), 1),
+            "rate_limit_wait_seconds": round(self.requests_bucket.waited_seconds + self.tokens_bucket.waited_seconds, 3)
+        }
+
+# Shared gateway; its HTTP client is created on first use and closed in the application lifespan
+llm_gateway = LLMGateway(Config())
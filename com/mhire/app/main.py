@@ -1,15 +1,50 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from com.mhire.app.config.config import Config
+from com.mhire.app.gateway.llm_gateway import LLMOverloaded, llm_gateway
+from com.mhire.app.services.preferences.upstream_client import UpstreamClient
+from com.mhire.app.services.preferences.analysis_jobs import get_analysis_job_queue, stop_analysis_job_queue
 from com.mhire.app.services.preferences.preferences_router import router as preferences_router
-from com.mhire.app.services.notification.notification_router import router as notification_router
-from com.mhire.app.services.date_mate.date_mate_router import router as date_mate_router
+from com.mhire.app.services.notification.notification_router import router as notification_router, get_notification_service, stop_notification_service
+from com.mhire.app.services.date_mate.date_mate_router import router as date_mate_router, stop_date_mate_service
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create shared resources on startup and release them on shutdown"""
+    await UpstreamClient.startup(Config())
+    await get_analysis_job_queue().start()
+    try:
+        get_notification_service().start()
+    except Exception as e:
+        # The rest of the API still serves; notification endpoints report the error
+        print(f"Notification service not started: {e}")
+    try:
+        yield
+    finally:
+        await stop_date_mate_service()
+        await stop_notification_service()
+        await stop_analysis_job_queue()
+        await UpstreamClient.shutdown()
+        await llm_gateway.aclose()
 
 # Create FastAPI application
 app = FastAPI(
     title="AI-Powered Dating Analysis API",
     description="Analyze user conversations and profiles using OpenAI to extract UserPreference format",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+@app.exception_handler(LLMOverloaded)
+async def llm_overloaded_handler(request: Request, exc: LLMOverloaded):
+    """Shed load with a fast 503 instead of queueing until the proxy times out"""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 # Include routers
 app.include_router(preferences_router)
 app.include_router(notification_router)
@@ -24,14 +59,18 @@ async def root():
         "version": "1.0.0",
         "main_endpoints": {
             "user_preference_analysis": "/api/v1/chats/analyze/{user_id} (POST)",
+            "batch_preference_analysis": "/api/v1/chats/analyze/batch (POST, NDJSON stream)",
+            "submit_analysis_job": "/api/v1/chats/jobs (POST)",
+            "analysis_job_status": "/api/v1/chats/jobs/{job_id} (GET)",
             "get_conversations": "/api/v1/chats/ai-conversation/{user_id} (GET)",
             "get_messages_only": "/api/v1/chats/messages/{user_id} (GET)",
+            "llm_gateway_stats": "/llm/stats (GET)",
             "docs": "/docs",
             "redoc": "/redoc"
         },
         "example_usage": {
             "analyze_user": "POST /api/v1/chats/analyze/682afd59c3a390babf9a9bb4",
-            "description": "Analyzes last 100 conversations and returns UserPreference format"
+            "description": "Analyzes the most recent conversations within the prompt token budget and returns UserPreference format"
         }
     }
 
@@ -40,6 +79,11 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "preferences-analysis-api"}
 
+@app.get("/llm/stats")
+async def llm_stats():
+    """Shared LLM gateway: per-service calls and retries, per-class queues and rejections, rate-limit budget"""
+    return llm_gateway.stats()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,142 @@
+import asyncio
+from typing import Dict, List, Optional, Set
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+from com.mhire.app.gateway.llm_gateway import BACKGROUND, DATE_MATE, LLMGateway, estimate_message_tokens, request_class
+from com.mhire.app.services.date_mate.date_mate_errors import SessionConflictError
+from com.mhire.app.services.date_mate.date_mate_schema import ChatState
+from com.mhire.app.services.date_mate.session_store import SessionStore
+from com.mhire.app.services.date_mate.turn_locks import TurnLocks
+
+SUMMARY_PROMPT = """You maintain the memory of an ongoing conversation between a user and Date Mate, a dating advisor and companion.
+Update the running summary with the new exchanges below. Keep every durable fact about the user (name, age, preferences,
+relationship goals, feelings, plans, people and events they mentioned), any role-play persona or name they chose for Date Mate,
+and open threads worth following up. Drop small talk. Write in French without accents, in at most {max_words} words.
+Return only the updated summary."""
+
+# Upper bound on the messages folded into the summary in one background run
+MAX_SUMMARY_BATCH_MESSAGES = 80
+
+ROLE_LABELS = {"user": "Utilisateur", "assistant": "Date Mate"}
+
+class ConversationContext:
+    """
+    Keeps the model context flat: system prompt, a rolling summary of older turns and the recent turns verbatim
+
+    Every message not yet folded into the summary is sent verbatim, so no turn is ever missing
+    from the context. Summarization keeps that tail between keep_turns and
+    keep_turns + summarize_after_turns exchanges.
+    """
+
+    def __init__(self, llm, gateway: LLMGateway, session_store: SessionStore, turn_locks: TurnLocks,
+                 keep_turns: int, summarize_after_turns: int, summary_max_tokens: int):
+        self.llm = llm
+        self.gateway = gateway
+        self.session_store = session_store
+        self.turn_locks = turn_locks
+        self.keep_turns = keep_turns
+        self.summarize_after_turns = summarize_after_turns
+        self.summary_max_tokens = summary_max_tokens
+        # Twice the tail that summarization normally maintains
+        self.max_verbatim_messages = (keep_turns + summarize_after_turns) * 4
+        self._pending: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.summaries = 0
+        self.summary_failures = 0
+        self.summary_conflicts = 0
+        self.messages_summarized = 0
+
+    def build(self, system_message: SystemMessage, chat_state: ChatState, history: List[BaseMessage],
+              pending: Optional[BaseMessage] = None) -> List[BaseMessage]:
+        """
+        Build the messages sent to the model for a turn
+
+        Args:
+            system_message: Shared system prompt
+            chat_state: Session holding the rolling summary
+            history: Converted session messages
+            pending: New user message not yet stored in the session
+
+        Returns:
+            List[BaseMessage]: System prompt, summary (if any) and the messages not yet summarized
+        """
+        context = [system_message]
+        if chat_state.summary:
+            context.append(SystemMessage(
+                content=f"Resume de la conversation precedente avec cet utilisateur:\n{chat_state.summary}"
+            ))
+        # Summarized messages are dropped from the session, so history is exactly the unsummarized
+        # tail. The cap only applies while summaries keep failing.
+        window = self.max_verbatim_messages + (1 if pending is None else 0)
+        context.extend(history[max(len(history) - window, 0):])
+        if pending is not None:
+            context.append(pending)
+        return context
+
+    def maybe_summarize(self, chat_state: ChatState):
+        """Schedule a background summary once enough turns have fallen out of the verbatim window"""
+        older = len(chat_state.messages) - self.keep_turns * 2
+        if older < self.summarize_after_turns * 2 or chat_state.user_id in self._pending:
+            return
+        batch = chat_state.messages[:min(older, MAX_SUMMARY_BATCH_MESSAGES)]
+        self._pending.add(chat_state.user_id)
+        task = asyncio.create_task(self._summarize(chat_state.user_id, chat_state.summary, list(batch)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _summarize(self, user_id: str, previous_summary: str, batch: List[Dict[str, str]]):
+        try:
+            transcript = "\n".join(f"{ROLE_LABELS.get(m['role'], m['role'])}: {m['content']}" for m in batch)
+            prompt = (
+                f"RESUME ACTUEL:\n{previous_summary or '(aucun)'}\n\n"
+                f"NOUVEAUX ECHANGES:\n{transcript}"
+            )
+            messages = [
+                SystemMessage(content=SUMMARY_PROMPT.format(max_words=self.summary_max_tokens * 3 // 4)),
+                HumanMessage(content=prompt)
+            ]
+            # Summaries are not on the reply path, so chat turns go first
+            with request_class(BACKGROUND):
+                response = await self.gateway.run(
+                    DATE_MATE,
+                    lambda: self.llm.ainvoke(messages, max_tokens=self.summary_max_tokens),
+                    estimate_message_tokens(messages) + self.summary_max_tokens
+                )
+            summary = response.content.strip()
+            if not summary:
+                raise ValueError("empty summary")
+
+            # Reload the session between turns: it may have moved on while the summary was generated
+            async with self.turn_locks.hold(user_id):
+                chat_state = await self.session_store.get(user_id)
+                if chat_state is None or chat_state.summary != previous_summary or chat_state.messages[:len(batch)] != batch:
+                    return
+                chat_state.summary = summary
+                chat_state.drop_oldest(len(batch))
+                await self.session_store.save(chat_state)
+            self.summaries += 1
+            self.messages_summarized += len(batch)
+        except SessionConflictError:
+            # Another worker saved a turn after the reload; its save wins and the next turn retries
+            self.summary_conflicts += 1
+        except Exception as e:
+            self.summary_failures += 1
+            print(f"Error summarizing conversation for {user_id}: {e}")
+        finally:
+            self._pending.discard(user_id)
+
+    async def stop(self):
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "keep_turns": self.keep_turns,
+            "summarize_after_turns": self.summarize_after_turns,
+            "summaries": self.summaries,
+            "summary_failures": self.summary_failures,
+            "summary_conflicts": self.summary_conflicts,
+            "messages_summarized": self.messages_summarized,
+            "pending": len(self._pending)
+        }
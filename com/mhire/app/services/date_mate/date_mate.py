@@ -1,10 +1,17 @@
 # -*- coding: utf-8 -*-
-from fastapi import FastAPI
-from typing import Dict, List, Any, Optional
+import json
+from typing import AsyncIterator, Dict, List, Any, Optional
 from com.mhire.app.config.config import Config
+from com.mhire.app.gateway.llm_gateway import DATE_MATE, LLMOverloaded, estimate_message_tokens, llm_gateway
 from langchain_openai import ChatOpenAI
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from com.mhire.app.services.date_mate.date_mate_schema import UserProfile, Message, ChatRequest, ChatResponse, ChatState
+from com.mhire.app.services.date_mate.session_store import create_session_store
+from com.mhire.app.services.date_mate.context_window import ConversationContext
+from com.mhire.app.services.date_mate.greeting_cache import GreetingCache
+from com.mhire.app.services.date_mate.topic_detector import create_topic_detector
+from com.mhire.app.services.date_mate.turn_locks import TurnLocks, TurnLockTimeout
+from com.mhire.app.services.date_mate.date_mate_errors import DateMateError, SessionConflictError, TurnBusyError
 
 class DateMate:
     def __init__(self, config: Config):
@@ -13,12 +20,44 @@ class DateMate:
         if not self.api_key:
             raise Exception("OpenAI API key is required")
         self.model_name = "gpt-3.5-turbo"
-        self.app = FastAPI(
-            title="Date Mate API",
-            description="API for the Date Mate dating advisor chatbot",
-            version="1.0.0"
+        # One long-lived chat model shared by all requests; connections, limits and retries
+        # come from the shared LLM gateway
+        self.llm = ChatOpenAI(
+            model=self.model_name,
+            openai_api_key=self.api_key,
+            temperature=0.7,
+            max_tokens=self.MAX_TOKENS,
+            http_async_client=llm_gateway.http_client(),
+            max_retries=0
+        )
+        self.session_store = create_session_store(self.config)
+        # Turns of one user run one at a time so they never interleave on the same session
+        self.turn_locks = TurnLocks(self.config.date_mate_turn_lock_timeout)
+        self.context = ConversationContext(
+            self.llm,
+            llm_gateway,
+            self.session_store,
+            self.turn_locks,
+            self.config.date_mate_context_turns,
+            self.config.date_mate_summary_trigger_turns,
+            self.config.date_mate_summary_max_tokens
         )
-        self.setup_routes()
+        self.topic_detector = create_topic_detector(self.config.date_mate_topic_lexicon)
+        self.greeting_cache = GreetingCache(
+            self.llm,
+            llm_gateway,
+            self.SYSTEM_MESSAGE,
+            self.MAX_TOKENS,
+            self.config.date_mate_greeting_cache,
+            self.config.date_mate_greeting_pool_size,
+            self.config.date_mate_greeting_refresh_interval
+        )
+
+    # Completion limit for chat replies
+    MAX_TOKENS = 1024
+
+    # Attempts to store a turn while other workers keep saving the same session
+    SAVE_ATTEMPTS = 3
 
     # System prompt for the dating advisor
     
@@ -160,47 +199,177 @@ Appropriate Response:
 Remember that your primary purpose is to provide authentic conversation, companionship and emotional support in a way that feels natural and human-like, ALWAYS IN FRENCH.
 """
 
-    user_sessions: Dict[str, ChatState] = {}
+    # One system message instance shared by every session; never mutated
+    SYSTEM_MESSAGE = SystemMessage(content=DATING_ADVISOR_PROMPT)
 
     def get_chat_model(self):
-        return ChatOpenAI(
-            model=self.model_name,
-            openai_api_key=self.api_key,
-            temperature=0.7,
-            max_tokens=1024
-        )
+        return self.llm
 
-    def initialize_chat_state(self, user_id: str) -> ChatState:
-        if user_id not in self.user_sessions:
-            self.user_sessions[user_id] = ChatState(
-                messages=[{"role": "system", "content": self.DATING_ADVISOR_PROMPT}],
+    async def initialize_chat_state(self, user_id: str) -> ChatState:
+        chat_state = await self.session_store.get(user_id)
+        if chat_state is None:
+            chat_state = ChatState(
+                messages=[],
                 context={"recent_topics": []},
                 user_id=user_id
             )
-        return self.user_sessions[user_id]
-
-    def setup_routes(self):
-        @self.app.post("/chat", response_model=ChatResponse)
-        async def chat(request: ChatRequest):
-            chat_state = self.initialize_chat_state(request.user_id)
-            chat_state.messages.append({"role": "user", "content": request.message})
-            if "recent_topics" in chat_state.context:
-                potential_topics = ["date", "match", "profile", "advice", "relationship"]
-                for topic in potential_topics:
-                    if topic in request.message.lower() and len(chat_state.context["recent_topics"]) < 5:
-                        if topic not in chat_state.context["recent_topics"]:
-                            chat_state.context["recent_topics"].append(topic)
-            llm = self.get_chat_model()
-            langchain_messages = []
-            for msg in chat_state.messages:
-                if msg["role"] == "system":
-                    langchain_messages.append(SystemMessage(content=msg["content"]))
-                elif msg["role"] == "user":
-                    langchain_messages.append(HumanMessage(content=msg["content"]))
-                elif msg["role"] == "assistant":
-                    langchain_messages.append(AIMessage(content=msg["content"]))
-            ai_response = llm.invoke(langchain_messages)
-            assistant_message = ai_response.content
-            chat_state.messages.append({"role": "assistant", "content": assistant_message})
-            self.user_sessions[request.user_id] = chat_state
-            return ChatResponse(response=assistant_message)
\ No newline at end of file
+        return chat_state
+
+    async def save_turn(self, chat_state: ChatState, new_messages: int) -> ChatState:
+        """
+        Store a finished turn; if another worker saved the session meanwhile, replay the turn on its copy
+
+        Turn locks only serialize turns within one process, so the shared backends reject a save
+        made on top of an outdated session instead of overwriting the other worker's turn.
+
+        Args:
+            chat_state: Session with the turn's messages appended
+            new_messages: Number of messages the turn appended
+
+        Returns:
+            ChatState: The session as stored
+
+        Raises:
+            SessionConflictError: The session kept changing for SAVE_ATTEMPTS attempts
+        """
+        turn = chat_state.messages[-new_messages:]
+        topics = chat_state.context.get("recent_topics", [])
+        for attempt in range(self.SAVE_ATTEMPTS):
+            try:
+                await self.session_store.save(chat_state)
+                return chat_state
+            except SessionConflictError:
+                if attempt == self.SAVE_ATTEMPTS - 1:
+                    raise
+            latest = await self.initialize_chat_state(chat_state.user_id)
+            latest.messages.extend(turn)
+            recent_topics = latest.context.setdefault("recent_topics", [])
+            for topic in topics:
+                if topic not in recent_topics and len(recent_topics) < 5:
+                    recent_topics.append(topic)
+            chat_state = latest
+
+    def update_recent_topics(self, chat_state: ChatState, message: str):
+        self.add_recent_topics(chat_state, self.topic_detector.detect(message))
+
+    @staticmethod
+    def add_recent_topics(chat_state: ChatState, topics: List[str]):
+        if "recent_topics" in chat_state.context:
+            for topic in topics:
+                if len(chat_state.context["recent_topics"]) < 5:
+                    if topic not in chat_state.context["recent_topics"]:
+                        chat_state.context["recent_topics"].append(topic)
+
+    @staticmethod
+    def to_langchain_messages(messages: List[Dict[str, str]]) -> list:
+        langchain_messages = []
+        for msg in messages:
+            if msg["role"] == "system":
+                langchain_messages.append(SystemMessage(content=msg["content"]))
+            elif msg["role"] == "user":
+                langchain_messages.append(HumanMessage(content=msg["content"]))
+            elif msg["role"] == "assistant":
+                langchain_messages.append(AIMessage(content=msg["content"]))
+        return langchain_messages
+
+    def langchain_history(self, chat_state: ChatState) -> list:
+        """Session messages in LangChain form, converting only messages added since the last turn"""
+        converted = chat_state._langchain_messages
+        if len(converted) < len(chat_state.messages):
+            converted.extend(self.to_langchain_messages(chat_state.messages[len(converted):]))
+        return converted
+
+    async def stream_chat(self, request: ChatRequest) -> AsyncIterator[str]:
+        """Stream the assistant reply as Server-Sent Events while tokens arrive from the model"""
+        try:
+            async with self.turn_locks.hold(request.user_id):
+                async for event in self._stream_turn(request):
+                    yield event
+        except (TurnLockTimeout, SessionConflictError) as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)}, ensure_ascii=False)}\n\n"
+
+    async def _stream_turn(self, request: ChatRequest) -> AsyncIterator[str]:
+        chat_state = await self.initialize_chat_state(request.user_id)
+        # Topics, like messages, are applied only to a completed turn
+        topics = self.topic_detector.detect(request.message)
+        user_message = {"role": "user", "content": request.message}
+        cached_reply = self.greeting_cache.opening_reply(chat_state, request.message)
+        if cached_reply is not None:
+            self.add_recent_topics(chat_state, topics)
+            chat_state.messages.append(user_message)
+            chat_state.messages.append({"role": "assistant", "content": cached_reply})
+            await self.save_turn(chat_state, 2)
+            yield f"data: {json.dumps({'token': cached_reply}, ensure_ascii=False)}\n\n"
+            yield f"event: done\ndata: {json.dumps({'response': cached_reply}, ensure_ascii=False)}\n\n"
+            return
+        langchain_messages = self.context.build(
+            self.SYSTEM_MESSAGE, chat_state, self.langchain_history(chat_state), HumanMessage(content=request.message)
+        )
+        llm = self.get_chat_model()
+        parts = []
+        try:
+            async with llm_gateway.slot(DATE_MATE, estimate_message_tokens(langchain_messages) + self.MAX_TOKENS):
+                async for chunk in llm.astream(langchain_messages):
+                    if chunk.content:
+                        parts.append(chunk.content)
+                        yield f"data: {json.dumps({'token': chunk.content}, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)}, ensure_ascii=False)}\n\n"
+            return
+        # The turn is recorded only once the full reply has arrived, so an aborted
+        # stream leaves the session exactly as it was
+        assistant_message = "".join(parts)
+        self.add_recent_topics(chat_state, topics)
+        chat_state.messages.append(user_message)
+        chat_state.messages.append({"role": "assistant", "content": assistant_message})
+        chat_state = await self.save_turn(chat_state, 2)
+        self.context.maybe_summarize(chat_state)
+        yield f"event: done\ndata: {json.dumps({'response': assistant_message}, ensure_ascii=False)}\n\n"
+
+    async def _chat_turn(self, request: ChatRequest) -> ChatResponse:
+        chat_state = await self.initialize_chat_state(request.user_id)
+        cached_reply = self.greeting_cache.opening_reply(chat_state, request.message)
+        chat_state.messages.append({"role": "user", "content": request.message})
+        self.update_recent_topics(chat_state, request.message)
+        if cached_reply is not None:
+            chat_state.messages.append({"role": "assistant", "content": cached_reply})
+            await self.save_turn(chat_state, 2)
+            return ChatResponse(response=cached_reply)
+        llm = self.get_chat_model()
+        langchain_messages = self.context.build(self.SYSTEM_MESSAGE, chat_state, self.langchain_history(chat_state))
+        try:
+            ai_response = await llm_gateway.run(
+                DATE_MATE,
+                lambda: llm.ainvoke(langchain_messages),
+                estimate_message_tokens(langchain_messages) + self.MAX_TOKENS
+            )
+        except LLMOverloaded:
+            raise
+        except Exception as e:
+            raise DateMateError(f"Chat model error: {str(e)}")
+        assistant_message = ai_response.content
+        chat_state.messages.append({"role": "assistant", "content": assistant_message})
+        chat_state = await self.save_turn(chat_state, 2)
+        self.context.maybe_summarize(chat_state)
+        return ChatResponse(response=assistant_message)
+
+    async def chat(self, request: ChatRequest) -> ChatResponse:
+        """
+        Run one chat turn for the user
+
+        Raises:
+            TurnBusyError: The user's previous turn did not finish in time
+            LLMOverloaded: Too many chat model calls are waiting
+            SessionConflictError: Other workers kept saving the session
+            DateMateError: The chat model call failed
+        """
+        try:
+            async with self.turn_locks.hold(request.user_id):
+                return await self._chat_turn(request)
+        except TurnLockTimeout as e:
+            raise TurnBusyError(str(e))
+
+    async def stop(self):
+        """Cancel background greeting refreshes and pending summaries"""
+        await self.greeting_cache.stop()
+        await self.context.stop()
\ No newline at end of file
@@ -0,0 +1,8 @@
+class DateMateError(Exception):
+    """Raised when a chat turn cannot be completed"""
+
+class TurnBusyError(DateMateError):
+    """Raised when the user's previous turn is still running after the wait limit"""
+
+class SessionConflictError(DateMateError):
+    """Raised when a session was saved by another process since it was loaded"""
@@ -1,8 +1,14 @@
+from typing import TYPE_CHECKING, Optional
 from fastapi import APIRouter, HTTPException
-from com.mhire.app.services.date_mate.date_mate import DateMate
+from fastapi.responses import StreamingResponse
+from com.mhire.app.gateway.llm_gateway import DATE_MATE, llm_gateway
+from com.mhire.app.services.date_mate.date_mate_errors import DateMateError, TurnBusyError
 from com.mhire.app.services.date_mate.date_mate_schema import ChatRequest
 from com.mhire.app.config.config import Config
 
+if TYPE_CHECKING:
+    from com.mhire.app.services.date_mate.date_mate import DateMate
+
 config = Config()
 router = APIRouter(
     prefix="/date-mate",
@@ -10,12 +16,47 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-date_mate_service = DateMate(config)
+date_mate_service: Optional["DateMate"] = None
+
+def get_date_mate_service() -> "DateMate":
+    """DateMate service, built on first use so langchain is only loaded once chat is used"""
+    global date_mate_service
+    if date_mate_service is None:
+        from com.mhire.app.services.date_mate.date_mate import DateMate
+        date_mate_service = DateMate(config)
+    return date_mate_service
+
+async def stop_date_mate_service():
+    if date_mate_service is not None:
+        await date_mate_service.stop()
 
 @router.post("/chat")
 async def chat(request: ChatRequest):
     try:
-        response = await date_mate_service.app.router.routes[-1].endpoint(request)
-        return response
+        return await get_date_mate_service().chat(request)
+    except TurnBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
     except DateMateError as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """Stream the reply as Server-Sent Events: token events, then a final done event"""
+    # Reject before the 200 is sent while chat calls are backed up; raises LLMOverloaded (503)
+    llm_gateway.check_admission(DATE_MATE)
+    return StreamingResponse(
+        get_date_mate_service().stream_chat(request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/stats")
+async def stats():
+    """Session store, turn lock, context window and greeting cache statistics"""
+    date_mate_service = get_date_mate_service()
+    return {
+        "sessions": date_mate_service.session_store.stats(),
+        "turn_locks": date_mate_service.turn_locks.stats(),
+        "context": date_mate_service.context.stats(),
+        "greeting_cache": date_mate_service.greeting_cache.stats()
+    }
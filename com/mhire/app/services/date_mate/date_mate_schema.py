@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
 from typing import Dict, List, Any, Optional
 
 class UserProfile(BaseModel):
@@ -23,4 +23,17 @@ class ChatResponse(BaseModel):
 class ChatState(BaseModel):
     messages: List[Dict[str, str]]
     context: Dict[str, Any]
-    user_id: str
\ No newline at end of file
+    user_id: str
+    # Rolling summary of turns no longer kept verbatim in messages
+    summary: str = ""
+    # LangChain form of messages (BaseMessage objects), extended one message at a time; not persisted.
+    # Typed loosely so importing the schema does not load langchain.
+    _langchain_messages: List[Any] = PrivateAttr(default_factory=list)
+    # Version of the stored copy this state was loaded from (0 if it was never stored); stores
+    # shared between processes only accept a save made on top of the latest version
+    _version: int = PrivateAttr(default=0)
+
+    def drop_oldest(self, count: int):
+        """Remove the oldest messages together with their converted counterparts"""
+        del self.messages[:count]
+        del self._langchain_messages[:count]
\ No newline at end of file
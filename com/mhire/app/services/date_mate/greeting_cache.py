@@ -0,0 +1,126 @@
+import asyncio
+import re
+import unicodedata
+from collections import deque
+from typing import Deque, Dict, Optional
+from langchain_core.messages import HumanMessage, SystemMessage
+from com.mhire.app.gateway.llm_gateway import BACKGROUND, DATE_MATE, LLMGateway, estimate_message_tokens, request_class
+from com.mhire.app.services.date_mate.date_mate_schema import ChatState
+
+# Opening messages served from the cache, grouped by the canonical greeting whose
+# replies they share. Variants are written in normalized form.
+GREETINGS = {
+    "bonjour": ["bonjour", "bjr", "bonjour a toi", "bonjour a vous"],
+    "salut": ["salut", "slt", "coucou", "cc", "hello", "hi", "hey", "yo", "hola", "salut a toi"],
+    "bonsoir": ["bonsoir", "bsr", "good evening"],
+    "ca va": [
+        "ca va", "comment ca va", "comment vas tu", "comment allez vous", "tu vas bien", "vous allez bien",
+        "salut ca va", "bonjour ca va", "coucou ca va", "hello ca va", "hi how are you", "how are you", "hey how are you"
+    ],
+}
+
+# Seconds to wait after a failed refresh before trying again
+RETRY_DELAY = 30
+
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+def normalize_message(message: str) -> str:
+    """Lowercase, strip accents and punctuation, and collapse whitespace"""
+    text = message.lower().replace("œ", "oe").replace("æ", "ae")
+    # Decomposed accents and any other non-ASCII characters are dropped by the ASCII encode
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return _NON_WORD.sub(" ", text).strip()
+
+class GreetingCache:
+    """Answers common opening messages from small pools of pre-generated replies refreshed in the background"""
+
+    def __init__(self, llm, gateway: LLMGateway, system_message: SystemMessage, reply_tokens: int,
+                 enabled: bool, pool_size: int, refresh_interval: float):
+        self.llm = llm
+        self.gateway = gateway
+        self.reply_tokens = reply_tokens
+        self.system_message = system_message
+        self.enabled = enabled
+        self.pool_size = pool_size
+        self.refresh_interval = refresh_interval
+        self._canonical = {variant: key for key, variants in GREETINGS.items() for variant in variants}
+        # Newest reply last; appending to a full pool retires the oldest one
+        self._pools: Dict[str, Deque[str]] = {key: deque(maxlen=pool_size) for key in GREETINGS}
+        self._next = 0
+        self._task: Optional[asyncio.Task] = None
+        self.lookups = 0
+        self.hits = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    def opening_reply(self, chat_state: ChatState, message: str) -> Optional[str]:
+        """
+        Return a cached reply when message is a known greeting opening a new session
+
+        Args:
+            chat_state: Session the message belongs to
+            message: Raw user message
+
+        Returns:
+            Optional[str]: Cached reply, or None when the model must answer
+        """
+        if not self.enabled or chat_state.messages or chat_state.summary:
+            return None
+        self._ensure_refreshing()
+        self.lookups += 1
+        key = self._canonical.get(normalize_message(message))
+        pool = self._pools.get(key)
+        if not pool:
+            return None
+        self.hits += 1
+        # Rotate through the pool so repeated openings do not all get the same reply
+        self._next += 1
+        return pool[self._next % len(pool)]
+
+    def _ensure_refreshing(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh_loop(self):
+        # Fill the pools first, then replace the oldest reply of each pool once per interval
+        while True:
+            filling = [key for key, pool in self._pools.items() if len(pool) < self.pool_size]
+            if not filling:
+                await asyncio.sleep(self.refresh_interval)
+            failures = self.refresh_failures
+            for key in filling or GREETINGS:
+                await self._refresh(key)
+            if self.refresh_failures > failures:
+                await asyncio.sleep(min(self.refresh_interval, RETRY_DELAY))
+
+    async def _refresh(self, key: str):
+        try:
+            messages = [self.system_message, HumanMessage(content=key)]
+            with request_class(BACKGROUND):
+                response = await self.gateway.run(
+                    DATE_MATE, lambda: self.llm.ainvoke(messages), estimate_message_tokens(messages) + self.reply_tokens
+                )
+            reply = response.content.strip()
+            if reply:
+                self._pools[key].append(reply)
+                self.refreshes += 1
+        except Exception as e:
+            self.refresh_failures += 1
+            print(f"Error generating cached greeting reply for '{key}': {e}")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.lookups, 3) if self.lookups else 0.0,
+            "pool_sizes": {key: len(pool) for key, pool in self._pools.items()},
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures
+        }
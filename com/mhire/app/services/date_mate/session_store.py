@@ -0,0 +1,265 @@
+import asyncio
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional
+from com.mhire.app.config.config import Config
+from com.mhire.app.services.date_mate.date_mate_errors import SessionConflictError
+from com.mhire.app.services.date_mate.date_mate_schema import ChatState
+
+# Rough per-object overheads used for the memory estimate
+SESSION_OVERHEAD_BYTES = 600
+MESSAGE_OVERHEAD_BYTES = 250
+# A LangChain message object (with its metadata dicts); its content string is shared with the session message
+CONVERTED_MESSAGE_OVERHEAD_BYTES = 800
+
+def estimate_session_bytes(state: ChatState) -> int:
+    """Approximate in-memory size of a session, including its cached LangChain messages"""
+    size = SESSION_OVERHEAD_BYTES + len(state.user_id) + len(state.summary)
+    for message in state.messages:
+        size += MESSAGE_OVERHEAD_BYTES + len(message["content"])
+    size += CONVERTED_MESSAGE_OVERHEAD_BYTES * len(state._langchain_messages)
+    return size
+
+def serialize_session(state: ChatState) -> bytes:
+    """Compact wire format for a session: zlib-compressed JSON"""
+    return zlib.compress(state.model_dump_json().encode("utf-8"), 1)
+
+def deserialize_session(data: bytes) -> ChatState:
+    return ChatState.model_validate_json(zlib.decompress(data))
+
+class SessionStore:
+    """
+    Interface for DateMate chat session storage
+
+    A session is loaded once at the start of a turn and saved once at the end, so a
+    shared backend lets any worker process or container serve the next message. A
+    networked key-value service (e.g. Redis) implements this with one GET and one
+    SET-with-expiry of serialize_session() bytes per turn, made conditional on the
+    version read (WATCH/MULTI or a Lua compare-and-set).
+    """
+
+    async def get(self, user_id: str) -> Optional[ChatState]:
+        raise NotImplementedError
+
+    async def save(self, state: ChatState):
+        """
+        Store the session
+
+        Raises:
+            SessionConflictError: The stored session changed since state was loaded
+        """
+        raise NotImplementedError
+
+    async def delete(self, user_id: str):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+class InMemorySessionStore(SessionStore):
+    """Bounded in-process session store with LRU, idle-TTL and memory-based eviction"""
+
+    def __init__(self, max_sessions: int, idle_ttl: float, max_bytes: int):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        # Ordered by last access, least recently used first
+        self._sessions: "OrderedDict[str, ChatState]" = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self.evictions = {"lru": 0, "ttl": 0, "memory": 0}
+
+    def _remove(self, user_id: str):
+        self._sessions.pop(user_id, None)
+        self._last_access.pop(user_id, None)
+        self._total_bytes -= self._sizes.pop(user_id, 0)
+
+    def _evict(self, now: float):
+        # Least recently used sessions come first, so expired ones are at the front
+        while self._sessions:
+            oldest = next(iter(self._sessions))
+            if now - self._last_access[oldest] <= self.idle_ttl:
+                break
+            self._remove(oldest)
+            self.evictions["ttl"] += 1
+        while len(self._sessions) > self.max_sessions:
+            self._remove(next(iter(self._sessions)))
+            self.evictions["lru"] += 1
+        while self._total_bytes > self.max_bytes and len(self._sessions) > 1:
+            self._remove(next(iter(self._sessions)))
+            self.evictions["memory"] += 1
+
+    async def get(self, user_id: str) -> Optional[ChatState]:
+        state = self._sessions.get(user_id)
+        if state is None:
+            return None
+        now = time.time()
+        if now - self._last_access[user_id] > self.idle_ttl:
+            self._remove(user_id)
+            self.evictions["ttl"] += 1
+            return None
+        self._sessions.move_to_end(user_id)
+        self._last_access[user_id] = now
+        return state
+
+    async def save(self, state: ChatState):
+        now = time.time()
+        size = estimate_session_bytes(state)
+        self._total_bytes += size - self._sizes.get(state.user_id, 0)
+        self._sizes[state.user_id] = size
+        self._sessions[state.user_id] = state
+        self._sessions.move_to_end(state.user_id)
+        self._last_access[state.user_id] = now
+        self._evict(now)
+
+    async def delete(self, user_id: str):
+        self._remove(user_id)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "sessions": len(self._sessions),
+            "estimated_bytes": self._total_bytes,
+            "max_sessions": self.max_sessions,
+            "idle_ttl": self.idle_ttl,
+            "max_bytes": self.max_bytes,
+            "evictions": dict(self.evictions)
+        }
+
+class SQLiteSessionStore(SessionStore):
+    """Persistent session store in a local SQLite database (WAL mode), safe to share between worker processes"""
+
+    # Expired and excess sessions are pruned once every this many saves
+    PRUNE_EVERY = 500
+
+    def __init__(self, path: str, max_sessions: int, idle_ttl: float):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS date_mate_sessions ("
+            "user_id TEXT PRIMARY KEY, data BLOB NOT NULL, updated_at REAL NOT NULL, version INTEGER NOT NULL DEFAULT 1)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(date_mate_sessions)")}
+        if "version" not in columns:
+            self._conn.execute("ALTER TABLE date_mate_sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_date_mate_sessions_updated ON date_mate_sessions (updated_at)")
+        self._conn.commit()
+        self._saves = 0
+        self.conflicts = 0
+        self.evictions = {"lru": 0, "ttl": 0}
+
+    def _get(self, user_id: str) -> Optional[ChatState]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, updated_at, version FROM date_mate_sessions WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.idle_ttl:
+            return None
+        state = deserialize_session(row[0])
+        state._version = row[2]
+        return state
+
+    def _save(self, user_id: str, data: bytes, version: int) -> int:
+        """Compare-and-swap write on the version the session was loaded at; returns the new version"""
+        now = time.time()
+        with self._lock:
+            if version == 0:
+                # New session: only replaces a row that has expired
+                saved = self._conn.execute(
+                    "INSERT INTO date_mate_sessions (user_id, data, updated_at, version) VALUES (?, ?, ?, 1) "
+                    "ON CONFLICT (user_id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at, "
+                    "version = date_mate_sessions.version + 1 WHERE date_mate_sessions.updated_at < ?",
+                    (user_id, data, now, now - self.idle_ttl)
+                ).rowcount
+            else:
+                saved = self._conn.execute(
+                    "UPDATE date_mate_sessions SET data = ?, updated_at = ?, version = version + 1 "
+                    "WHERE user_id = ? AND version = ?",
+                    (data, now, user_id, version)
+                ).rowcount
+            if saved:
+                new_version = self._conn.execute(
+                    "SELECT version FROM date_mate_sessions WHERE user_id = ?", (user_id,)
+                ).fetchone()[0]
+            self._conn.commit()
+            if not saved:
+                self.conflicts += 1
+                raise SessionConflictError(f"Session of user {user_id} was changed by another worker")
+            self._saves += 1
+            if self._saves % self.PRUNE_EVERY == 0:
+                self._prune()
+        return new_version
+
+    def _prune(self):
+        expired = self._conn.execute(
+            "DELETE FROM date_mate_sessions WHERE updated_at < ?", (time.time() - self.idle_ttl,)
+        ).rowcount
+        excess = self._conn.execute(
+            "DELETE FROM date_mate_sessions WHERE user_id IN ("
+            "SELECT user_id FROM date_mate_sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,)
+        ).rowcount
+        self._conn.commit()
+        self.evictions["ttl"] += expired
+        self.evictions["lru"] += excess
+
+    def _delete(self, user_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM date_mate_sessions WHERE user_id = ?", (user_id,))
+            self._conn.commit()
+
+    async def get(self, user_id: str) -> Optional[ChatState]:
+        return await asyncio.to_thread(self._get, user_id)
+
+    async def save(self, state: ChatState):
+        state._version = await asyncio.to_thread(self._save, state.user_id, serialize_session(state), state._version)
+
+    async def delete(self, user_id: str):
+        await asyncio.to_thread(self._delete, user_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions, stored_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM date_mate_sessions"
+            ).fetchone()
+        return {
+            "backend": "sqlite",
+            "sessions": sessions,
+            "stored_bytes": stored_bytes,
+            "max_sessions": self.max_sessions,
+            "idle_ttl": self.idle_ttl,
+            "conflicts": self.conflicts,
+            "evictions": dict(self.evictions)
+        }
+
+def create_session_store(config: Config) -> SessionStore:
+    """
+    Build the session store for the configured backend
+
+    Args:
+        config: Application configuration
+
+    Returns:
+        SessionStore: In-memory (default) or SQLite session store
+    """
+    if config.date_mate_session_backend == "sqlite":
+        return SQLiteSessionStore(
+            config.date_mate_session_db_path,
+            config.date_mate_max_sessions,
+            config.date_mate_session_idle_ttl
+        )
+    if config.date_mate_session_backend != "memory":
+        raise ValueError(f"Unknown DATE_MATE_SESSION_BACKEND: {config.date_mate_session_backend}")
+    return InMemorySessionStore(
+        config.date_mate_max_sessions,
+        config.date_mate_session_idle_ttl,
+        config.date_mate_session_max_bytes
+    )
@@ -0,0 +1,112 @@
+import json
+import re
+from typing import Dict, List, Optional
+from com.mhire.app.services.date_mate.greeting_cache import normalize_message
+
+# Default French/English lexicon: topic -> terms. Terms are matched on whole words after
+# lowercasing and accent stripping, and a trailing plural "s" or "x" is accepted.
+DEFAULT_LEXICON = {
+    "date": [
+        "date", "rendez vous", "rdv", "rencard", "premier rendez vous", "sortie", "diner", "soiree",
+        "first date", "dinner", "restaurant", "cafe", "cinema", "verre", "drink", "boire un verre"
+    ],
+    "match": [
+        "match", "matcher", "matche", "swipe", "like", "tinder", "bumble", "hinge", "appli de rencontre",
+        "application de rencontre", "site de rencontre", "dating app", "crush", "coup de foudre"
+    ],
+    "profile": [
+        "profil", "profile", "bio", "photo", "selfie", "description", "presentation", "pseudo", "username"
+    ],
+    "advice": [
+        "conseil", "conseille", "aide", "aider", "astuce", "que faire", "quoi faire", "comment faire",
+        "advice", "tip", "help", "suggestion", "recommandation"
+    ],
+    "relationship": [
+        "relation", "relation serieuse", "couple", "copain", "copine", "petit ami", "petite amie", "partenaire",
+        "ame soeur", "fiancailles", "mariage", "marier", "relationship", "boyfriend", "girlfriend", "partner",
+        "engagement", "wedding", "long terme", "engagement serieux"
+    ],
+    "feelings": [
+        "amour", "aimer", "sentiment", "seul", "seule", "solitude", "triste", "jaloux", "jalouse", "jalousie",
+        "stress", "anxieux", "anxieuse", "timide", "confiance", "love", "lonely", "sad", "jealous", "shy", "nervous"
+    ],
+    "breakup": [
+        "rupture", "rompre", "separation", "separer", "divorce", "ex", "quitter", "largue", "ghosting", "ghoste",
+        "breakup", "break up", "broke up", "dumped"
+    ],
+    "communication": [
+        "message", "texto", "sms", "appel", "appeler", "repondre", "reponse", "conversation", "discuter",
+        "parler", "text", "call", "reply", "chat"
+    ],
+    "intimacy": [
+        "bisou", "embrasser", "baiser", "calin", "intimite", "kiss", "cuddle", "intimacy"
+    ],
+    "family": [
+        "famille", "parents", "enfant", "enfants", "bebe", "mere", "pere", "family", "kids", "children", "baby"
+    ],
+}
+
+def _trie_pattern(node: dict) -> str:
+    """Regex for a character trie: shared prefixes are factored so matching cost does not grow with the term count"""
+    terminal = "" in node
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char != ""]
+    if not branches:
+        return ""
+    if len(branches) == 1 and not terminal:
+        return branches[0]
+    pattern = "(?:" + "|".join(branches) + ")"
+    return pattern + "?" if terminal else pattern
+
+class TopicDetector:
+    """Detects conversation topics with a single regex compiled from a term lexicon"""
+
+    def __init__(self, lexicon: Dict[str, List[str]]):
+        self._topics: Dict[str, str] = {}
+        trie: dict = {}
+        for topic, terms in lexicon.items():
+            for term in terms:
+                normalized = normalize_message(term)
+                if not normalized:
+                    continue
+                # The first topic listing a term owns it
+                self._topics.setdefault(normalized, topic)
+                node = trie
+                for char in normalized:
+                    node = node.setdefault(char, {})
+                node[""] = {}
+        self.term_count = len(self._topics)
+        self._pattern = re.compile(r"\b(" + _trie_pattern(trie) + r")(?:s|x)?\b") if self._topics else None
+
+    def detect(self, message: str) -> List[str]:
+        """
+        Find the topics mentioned in a message
+
+        Args:
+            message: Raw user message
+
+        Returns:
+            List[str]: Distinct topics in order of first mention
+        """
+        if self._pattern is None:
+            return []
+        topics = []
+        for match in self._pattern.finditer(normalize_message(message)):
+            topic = self._topics[match.group(1)]
+            if topic not in topics:
+                topics.append(topic)
+        return topics
+
+def create_topic_detector(lexicon_path: Optional[str] = None) -> TopicDetector:
+    """
+    Build the topic detector from a JSON lexicon file, or the default lexicon
+
+    Args:
+        lexicon_path: Path to a JSON object mapping topics to lists of terms
+
+    Returns:
+        TopicDetector: Detector compiled from the lexicon
+    """
+    if lexicon_path:
+        with open(lexicon_path, encoding="utf-8") as f:
+            return TopicDetector(json.load(f))
+    return TopicDetector(DEFAULT_LEXICON)
@@ -0,0 +1,80 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+class TurnLockTimeout(TimeoutError):
+    """Raised when a user's previous turn did not finish within the wait limit"""
+
+class _UserLock:
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        # Turns holding or waiting for the lock
+        self.users = 0
+
+class TurnLocks:
+    """Serializes chat turns per user with one lock per active user"""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        # Entries exist only while a turn of that user holds or waits for the lock,
+        # so memory is bounded by the number of users chatting right now
+        self._locks: Dict[str, _UserLock] = {}
+        self.acquired = 0
+        self.contended = 0
+        self.timeouts = 0
+        self.max_wait = 0.0
+        self.max_active_users = 0
+
+    @asynccontextmanager
+    async def hold(self, user_id: str, timeout: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        Hold the user's turn lock; turns of other users never wait for it
+
+        Args:
+            user_id: User whose turn is starting
+            timeout: Longest wait in seconds, defaults to the configured timeout
+
+        Raises:
+            TurnLockTimeout: The lock was not acquired in time
+        """
+        entry = self._locks.get(user_id)
+        if entry is None:
+            entry = self._locks[user_id] = _UserLock()
+            self.max_active_users = max(self.max_active_users, len(self._locks))
+        entry.users += 1
+        try:
+            if not entry.lock.locked():
+                # Uncontended: acquire() completes without suspending
+                await entry.lock.acquire()
+            else:
+                self.contended += 1
+                started = time.monotonic()
+                try:
+                    await asyncio.wait_for(entry.lock.acquire(), self.timeout if timeout is None else timeout)
+                except asyncio.TimeoutError:
+                    self.timeouts += 1
+                    raise TurnLockTimeout(f"Timed out waiting for the previous turn of user {user_id}")
+                self.max_wait = max(self.max_wait, time.monotonic() - started)
+            self.acquired += 1
+            try:
+                yield
+            finally:
+                entry.lock.release()
+        finally:
+            entry.users -= 1
+            if entry.users == 0:
+                del self._locks[user_id]
+
+    def stats(self) -> dict:
+        return {
+            "active_users": len(self._locks),
+            "max_active_users": self.max_active_users,
+            "timeout": self.timeout,
+            "acquired": self.acquired,
+            "contended": self.contended,
+            "timeouts": self.timeouts,
+            "max_wait_seconds": round(self.max_wait, 3)
+        }
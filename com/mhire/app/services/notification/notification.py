@@ -1,12 +1,18 @@
 import os
+import socket
+import uuid
 from datetime import datetime
-from typing import List
-import httpx
+from typing import List, Optional
 from fastapi import FastAPI
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from com.mhire.app.config.config import Config
+from com.mhire.app.gateway.llm_gateway import NOTIFICATION, estimate_message_tokens, llm_gateway
 from com.mhire.app.services.notification.notification_schema import Quote
+from com.mhire.app.services.notification.quote_pool import QuotePool
+from com.mhire.app.services.notification.quote_store import QuoteStore
+
+DAILY_QUOTE_LEASE = "daily_quote"
 
 class Notification:
     def __init__(self, config: Config):
@@ -18,18 +24,39 @@ class Notification:
             raise Exception("OPENAI_API_KEY, OPENAI_ENDPOINT, and MODEL are required")
         
         self.scheduler = AsyncIOScheduler()
-        self.quotes_history: List[Quote] = []
+        # Shared by all worker processes, so they agree on the history and only one generates the daily quote
+        self.quote_store = QuoteStore(self.config.notification_db_path, self.config.notification_quote_history)
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Quotes are generated ahead of time so requests never wait on the model
+        self.quote_pool = QuotePool(
+            lambda: self.generate_quotes(self.config.notification_quote_batch_size),
+            self.config.notification_quote_pool_low,
+            self.config.notification_quote_pool_high
+        )
         
-        # Start the scheduler
+    def start(self):
+        """Schedule the daily quote job and start filling the quote pool"""
+        # Every process schedules the job but only the lease holder runs it
         self.scheduler.add_job(
-            self.store_daily_quote,
+            self.run_daily_quote,
             CronTrigger(hour=9, minute=0),
-            id="daily_quote"
+            id="daily_quote",
+            replace_existing=True
         )
         self.scheduler.start()
+        self.quote_pool.start()
+
+    async def stop(self):
+        self.cleanup()
+        await self.quote_pool.stop()
 
     async def generate_quote(self):
         """Generate a creative dating suggestion quote in French"""
+        quotes = await self.generate_quotes(1)
+        return quotes[0]
+
+    async def generate_quotes(self, count: int) -> List[str]:
+        """Generate several creative dating suggestion quotes in French with one completion request"""
         headers = {
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self.api_key}"
@@ -60,24 +87,55 @@ class Notification:
             "max_tokens": 100,
             "temperature": 0.9,
             "presence_penalty": 0.6,
-            "frequency_penalty": 0.6
+            "frequency_penalty": 0.6,
+            "n": count
         }
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(self.openai_endpoint, json=payload, headers=headers)
+
+        async def request():
+            response = await llm_gateway.http_client().post(
+                self.openai_endpoint, json=payload, headers=headers, timeout=30.0
+            )
             response.raise_for_status()
-            data = response.json()
-            quote = data["choices"][0]["message"]["content"].strip()
-            return quote
+            return response.json()
 
-    async def store_daily_quote(self) -> Quote:
+        data = await llm_gateway.run(
+            NOTIFICATION, request, estimate_message_tokens(payload["messages"]) + payload["max_tokens"] * count
+        )
+        quotes = [choice["message"]["content"].strip() for choice in data["choices"]]
+        return [quote for quote in quotes if quote]
+
+    @property
+    def quotes_history(self) -> List[Quote]:
+        return self.quote_store.history()
+
+    async def store_daily_quote(self, daily: bool = False) -> Quote:
         """Store and return a new dating suggestion quote"""
-        quote_text = await self.generate_quote()
+        quote_text = await self.quote_pool.take()
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         quote = Quote(quote=quote_text, timestamp=timestamp)
-        self.quotes_history.append(quote)
-        if len(self.quotes_history) > 30:
-            self.quotes_history.pop(0)
-        return quote
+        return self.quote_store.add(quote, daily=daily)
+
+    async def run_daily_quote(self) -> Optional[Quote]:
+        """
+        Generate today's scheduled quote in exactly one process
+
+        Returns:
+            Optional[Quote]: Today's quote, or None while another process is generating it
+        """
+        day = datetime.now().strftime("%Y-%m-%d")
+        quote = self.quote_store.daily_quote(day)
+        if quote is not None:
+            return quote
+        if not self.quote_store.try_acquire_lease(DAILY_QUOTE_LEASE, self.instance_id, self.config.notification_lease_ttl):
+            return None
+        try:
+            # Another process may have finished between the check and the lease
+            quote = self.quote_store.daily_quote(day)
+            if quote is None:
+                quote = await self.store_daily_quote(daily=True)
+            return quote
+        finally:
+            self.quote_store.release_lease(DAILY_QUOTE_LEASE, self.instance_id)
 
     def cleanup(self):
         """Cleanup resources"""
@@ -1,5 +1,10 @@
-from fastapi import APIRouter
+import hashlib
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from com.mhire.app.services.notification.notification import Notification
+from com.mhire.app.services.notification.notification_schema import Quote, QuoteHistoryPage
 from com.mhire.app.config.config import Config
 
 config = Config()
@@ -9,9 +14,82 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-notification_service = Notification(config)
+notification_service: Optional[Notification] = None
+
+def get_notification_service() -> Notification:
+    """Notification service, built on first use; raises if its configuration is missing"""
+    global notification_service
+    if notification_service is None:
+        notification_service = Notification(config)
+    return notification_service
+
+async def stop_notification_service():
+    if notification_service is not None:
+        await notification_service.stop()
+
+def _cacheable_response(request: Request, body: str, last_modified: datetime) -> Response:
+    """
+    JSON response with validators, answering conditional requests with 304 Not Modified
+
+    Args:
+        request: Incoming request, checked for If-None-Match / If-Modified-Since
+        body: Serialized JSON body
+        last_modified: Time the newest quote in the body was stored
+
+    Returns:
+        Response: 200 with the body, or 304 when the client's copy is current
+    """
+    etag = '"' + hashlib.sha256(body.encode("utf-8")).hexdigest()[:32] + '"'
+    modified = int(last_modified.timestamp())
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(modified, usegmt=True),
+        "Cache-Control": f"public, max-age={config.notification_cache_max_age}"
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since"):
+        try:
+            if modified <= parsedate_to_datetime(request.headers["if-modified-since"]).timestamp():
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def _stored_at(quote: Quote) -> datetime:
+    return datetime.strptime(quote.timestamp, "%Y-%m-%d %H:%M:%S")
 
 @router.get("/generate")
 async def generate_now():
     """Generate a new dating suggestion quote"""
-    return await notification_service.store_daily_quote()
+    return await get_notification_service().store_daily_quote()
+
+@router.get("/today", response_model=Quote)
+async def today(request: Request):
+    """Latest daily quote, shared by all workers and cacheable by proxies and clients"""
+    notification_service = get_notification_service()
+    quote = notification_service.quote_store.latest_daily_quote()
+    if quote is None:
+        # Nothing scheduled has run yet: generate the first daily quote now
+        quote = await notification_service.run_daily_quote()
+    if quote is None:
+        raise HTTPException(status_code=503, detail="Daily quote is being generated", headers={"Retry-After": "5"})
+    return _cacheable_response(request, quote.model_dump_json(), _stored_at(quote))
+
+@router.get("/history", response_model=QuoteHistoryPage)
+async def history(request: Request, page: int = Query(1, ge=1), page_size: int = Query(10, ge=1, le=100)):
+    """Stored quotes, newest first"""
+    notification_service = get_notification_service()
+    items, total = notification_service.quote_store.page((page - 1) * page_size, page_size)
+    body = QuoteHistoryPage(items=items, page=page, page_size=page_size, total=total).model_dump_json()
+    # Any new quote shifts every page, so all pages share the newest quote's time
+    newest = items if page == 1 else notification_service.quote_store.page(0, 1)[0]
+    last_modified = _stored_at(newest[0]) if newest else datetime.fromtimestamp(0)
+    return _cacheable_response(request, body, last_modified)
+
+@router.get("/stats")
+async def stats():
+    """Quote pool statistics"""
+    return {"quote_pool": get_notification_service().quote_pool.stats()}
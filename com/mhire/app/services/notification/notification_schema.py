@@ -1,5 +1,12 @@
+from typing import List
 from pydantic import BaseModel
 
 class Quote(BaseModel):
     quote: str
-    timestamp: str
\ No newline at end of file
+    timestamp: str
+
+class QuoteHistoryPage(BaseModel):
+    items: List[Quote]
+    page: int
+    page_size: int
+    total: int
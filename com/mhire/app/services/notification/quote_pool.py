@@ -0,0 +1,104 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, List, Optional
+
+class QuotePool:
+    """Pool of pre-generated quotes, refilled in batches in the background between a low and a high watermark"""
+
+    def __init__(self, generate_batch: Callable[[], Awaitable[List[str]]], low_watermark: int, high_watermark: int):
+        self.generate_batch = generate_batch
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self._quotes = deque()
+        self._refill_task: Optional[asyncio.Task] = None
+        self._last_error: Optional[Exception] = None
+        self._available = asyncio.Event()
+        self.served = 0
+        self.empty_waits = 0
+        self.refills = 0
+        self.refill_failures = 0
+        self.generated = 0
+        self.last_refill_seconds = 0.0
+        self.total_refill_seconds = 0.0
+
+    def start(self):
+        """Start filling the pool up to the high watermark"""
+        self._ensure_refilling()
+
+    async def stop(self):
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            await asyncio.gather(self._refill_task, return_exceptions=True)
+            self._refill_task = None
+
+    def _ensure_refilling(self) -> asyncio.Task:
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+        return self._refill_task
+
+    async def _refill(self):
+        while len(self._quotes) < self.high_watermark:
+            started = time.monotonic()
+            try:
+                quotes = await self.generate_batch()
+                if not quotes:
+                    raise ValueError("Quote generation returned no quotes")
+            except Exception as e:
+                # Recorded for callers waiting on an empty pool; the next take() retries
+                self.refill_failures += 1
+                self._last_error = e
+                print(f"Error refilling quote pool: {e}")
+                return
+            elapsed = time.monotonic() - started
+            self.refills += 1
+            self.generated += len(quotes)
+            self.last_refill_seconds = elapsed
+            self.total_refill_seconds += elapsed
+            self._quotes.extend(quotes)
+            self._available.set()
+
+    async def take(self) -> str:
+        """
+        Take the next quote, waiting for a refill only when the pool is empty
+
+        Returns:
+            str: A quote that has not been served before
+
+        Raises:
+            Exception: The refill the caller waited on failed
+        """
+        if not self._quotes:
+            self.empty_waits += 1
+        while not self._quotes:
+            failures = self.refill_failures
+            refill = self._ensure_refilling()
+            # Wake up on the first batch rather than when the pool reaches the high watermark;
+            # asyncio.wait never cancels the shared refill, even if this caller is cancelled
+            self._available.clear()
+            available = asyncio.ensure_future(self._available.wait())
+            try:
+                await asyncio.wait({available, refill}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                available.cancel()
+            if not self._quotes and self.refill_failures > failures:
+                raise self._last_error
+        quote = self._quotes.popleft()
+        self.served += 1
+        if len(self._quotes) < self.low_watermark:
+            self._ensure_refilling()
+        return quote
+
+    def stats(self) -> dict:
+        return {
+            "depth": len(self._quotes),
+            "low_watermark": self.low_watermark,
+            "high_watermark": self.high_watermark,
+            "served": self.served,
+            "empty_waits": self.empty_waits,
+            "refills": self.refills,
+            "refill_failures": self.refill_failures,
+            "generated": self.generated,
+            "last_refill_seconds": round(self.last_refill_seconds, 3),
+            "avg_refill_seconds": round(self.total_refill_seconds / self.refills, 3) if self.refills else 0.0
+        }
@@ -0,0 +1,128 @@
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+from com.mhire.app.services.notification.notification_schema import Quote
+
+class QuoteStore:
+    """Quote history and leases in a SQLite database (WAL mode) shared by every worker process on the host"""
+
+    def __init__(self, path: str, history_limit: int):
+        self.history_limit = history_limit
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS quotes ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, quote TEXT NOT NULL, timestamp TEXT NOT NULL, "
+            "day TEXT NOT NULL, daily INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_quotes_daily ON quotes (day) WHERE daily = 1")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def add(self, quote: Quote, daily: bool = False) -> Quote:
+        """
+        Append a quote to the history, keeping the newest history_limit quotes of each kind
+
+        Daily and on-demand quotes are trimmed separately, so /generate calls never remove the
+        day's scheduled quote (which would let it be generated a second time).
+
+        Args:
+            quote: Quote to store
+            daily: Whether this is the scheduled quote of its day
+
+        Returns:
+            Quote: The stored quote, or the day's existing daily quote if another process stored it first
+        """
+        day = quote.timestamp[:10]
+        with self._lock:
+            inserted = self._conn.execute(
+                "INSERT OR IGNORE INTO quotes (quote, timestamp, day, daily) VALUES (?, ?, ?, ?)",
+                (quote.quote, quote.timestamp, day, int(daily))
+            ).rowcount
+            self._conn.execute(
+                "DELETE FROM quotes WHERE daily = ? AND id <= "
+                "(SELECT id FROM quotes WHERE daily = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (int(daily), int(daily), self.history_limit)
+            )
+        if not inserted:
+            return self.daily_quote(day) or quote
+        return quote
+
+    def history(self) -> List[Quote]:
+        """The newest history_limit quotes, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT quote, timestamp FROM quotes ORDER BY id DESC LIMIT ?", (self.history_limit,)
+            ).fetchall()
+        return [Quote(quote=row[0], timestamp=row[1]) for row in reversed(rows)]
+
+    def page(self, offset: int, limit: int) -> Tuple[List[Quote], int]:
+        """
+        A page of the history (the newest history_limit quotes), newest first
+
+        Args:
+            offset: Number of newer quotes to skip
+            limit: Page size
+
+        Returns:
+            Tuple[List[Quote], int]: Quotes on the page and the number of quotes in the history
+        """
+        limit = max(0, min(limit, self.history_limit - offset))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT quote, timestamp FROM quotes ORDER BY id DESC LIMIT ? OFFSET ?", (limit, offset)
+            ).fetchall()
+            total = min(self._conn.execute("SELECT COUNT(*) FROM quotes").fetchone()[0], self.history_limit)
+        return [Quote(quote=row[0], timestamp=row[1]) for row in rows], total
+
+    def latest_daily_quote(self) -> Optional[Quote]:
+        """The most recent scheduled quote"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT quote, timestamp FROM quotes WHERE daily = 1 ORDER BY id DESC LIMIT 1"
+            ).fetchone()
+        return Quote(quote=row[0], timestamp=row[1]) if row is not None else None
+
+    def daily_quote(self, day: str) -> Optional[Quote]:
+        """The scheduled quote of a day (YYYY-MM-DD), if it has been generated"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT quote, timestamp FROM quotes WHERE day = ? AND daily = 1", (day,)
+            ).fetchone()
+        return Quote(quote=row[0], timestamp=row[1]) if row is not None else None
+
+    def try_acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """
+        Take or renew a named lease unless another owner holds an unexpired one
+
+        Args:
+            name: Lease name
+            owner: Identifier of the calling process
+            ttl: Lease duration in seconds
+
+        Returns:
+            bool: True if the caller now holds the lease
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT owner, expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+                acquired = row is None or row[0] == owner or row[1] < now
+                if acquired:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)",
+                        (name, owner, now + ttl)
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return acquired
+
+    def release_lease(self, name: str, owner: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
@@ -0,0 +1,378 @@
+import asyncio
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+import httpx
+from com.mhire.app.config.config import Config
+from com.mhire.app.gateway.llm_gateway import BACKGROUND, LLMOverloaded, request_class
+from com.mhire.app.services.preferences.preferences import PreferencesService, UserDataNotFoundError
+from com.mhire.app.services.preferences.preferences_schema import AnalysisJob, UserPreference
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Completed jobs kept in memory for latency percentiles
+LATENCY_WINDOW = 1000
+
+# Seconds allowed for delivering a job callback
+CALLBACK_TIMEOUT = 10
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percentile / 100 * (len(ordered) - 1))))
+    return round(ordered[index], 3)
+
+class AnalysisJobQueue:
+    """
+    Persistent SQLite-backed queue of preference analysis jobs run by an in-process worker pool
+
+    Several processes may share the database. A running job is leased to the process that
+    claimed it and the lease is renewed while it runs; only jobs whose lease has expired
+    (their process died) are claimed again by another process.
+    """
+
+    def __init__(self, path: str, workers: int, retention: float, lease_ttl: float,
+                 callback_hosts: Optional[Iterable[str]] = None):
+        self.workers = workers
+        self.retention = retention
+        self.lease_ttl = lease_ttl
+        self.callback_hosts = {host.lower() for host in callback_hosts or ()}
+        # Callbacks go to caller-chosen hosts, so they never share the upstream client and its base URL
+        self._callback_client: Optional[httpx.AsyncClient] = None
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_jobs ("
+            "job_id TEXT PRIMARY KEY, user_id TEXT NOT NULL, status TEXT NOT NULL, "
+            "refresh INTEGER NOT NULL, full INTEGER NOT NULL, callback_url TEXT, "
+            "result TEXT, error TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL, "
+            "owner TEXT, lease_expires_at REAL)"
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(analysis_jobs)")}
+        for column, kind in (("owner", "TEXT"), ("lease_expires_at", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE analysis_jobs ADD COLUMN {column} {kind}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_jobs_status ON analysis_jobs (status, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_jobs_user ON analysis_jobs (user_id, status)")
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._total_latencies = deque(maxlen=LATENCY_WINDOW)
+        self._run_latencies = deque(maxlen=LATENCY_WINDOW)
+        self.deduplicated = 0
+        self.requeued = 0
+        self.reclaimed = 0
+
+    def _prune(self):
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM analysis_jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (SUCCEEDED, FAILED, time.time() - self.retention)
+            )
+
+    def _release_owned(self):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE analysis_jobs SET status = ?, started_at = NULL, owner = NULL, lease_expires_at = NULL "
+                "WHERE status = ? AND owner = ?",
+                (QUEUED, RUNNING, self.instance_id)
+            )
+
+    async def start(self):
+        """Start the worker pool; jobs left running by a dead process are claimed once their lease expires"""
+        await asyncio.to_thread(self._prune)
+        self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop the worker pool and hand this process's unfinished jobs back to the queue"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._callback_client is not None:
+            await self._callback_client.aclose()
+            self._callback_client = None
+        await asyncio.to_thread(self._release_owned)
+
+    async def submit(self, user_id: str, refresh: bool = False, full: bool = False,
+                     callback_url: Optional[str] = None) -> AnalysisJob:
+        """
+        Queue an analysis, or return the pending job already queued or running for the user
+
+        Args:
+            user_id: User ID to analyze
+            refresh: Bypass the result cache
+            full: Force a full (non-incremental) re-analysis
+            callback_url: URL that receives the finished job as a JSON POST
+
+        Returns:
+            AnalysisJob: The new or existing job
+        """
+        # SQLite may wait on another process's write lock, so it runs off the event loop
+        row, deduplicated = await asyncio.to_thread(self._submit, user_id, refresh, full, callback_url)
+        if deduplicated:
+            self.deduplicated += 1
+        elif self._wakeup is not None:
+            self._wakeup.set()
+        return self._to_job(row, deduplicated)
+
+    def _submit(self, user_id: str, refresh: bool, full: bool, callback_url: Optional[str]) -> Tuple[sqlite3.Row, bool]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM analysis_jobs WHERE user_id = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                    (user_id, QUEUED, RUNNING)
+                ).fetchone()
+                if row is None:
+                    job_id = uuid.uuid4().hex
+                    self._conn.execute(
+                        "INSERT INTO analysis_jobs (job_id, user_id, status, refresh, full, callback_url, created_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (job_id, user_id, QUEUED, int(refresh), int(full), callback_url, time.time())
+                    )
+                    row = self._conn.execute("SELECT * FROM analysis_jobs WHERE job_id = ?", (job_id,)).fetchone()
+                    deduplicated = False
+                else:
+                    deduplicated = True
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row, deduplicated
+
+    def callback_allowed(self, url: str) -> bool:
+        """Whether a callback may be POSTed to url: absolute http(s), on an allowed host if a list is configured"""
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            return False
+        return not self.callback_hosts or parts.hostname.lower() in self.callback_hosts
+
+    def _get(self, job_id: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute("SELECT * FROM analysis_jobs WHERE job_id = ?", (job_id,)).fetchone()
+
+    async def get(self, job_id: str) -> Optional[AnalysisJob]:
+        row = await asyncio.to_thread(self._get, job_id)
+        return self._to_job(row) if row is not None else None
+
+    def _claim(self) -> Optional[sqlite3.Row]:
+        """Atomically lease the oldest queued job, or a running job whose owner stopped renewing it"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT * FROM analysis_jobs WHERE status = ? "
+                    "OR (status = ? AND (lease_expires_at IS NULL OR lease_expires_at < ?)) "
+                    "ORDER BY created_at LIMIT 1",
+                    (QUEUED, RUNNING, now)
+                ).fetchone()
+                if row is not None:
+                    if row["status"] == RUNNING:
+                        self.reclaimed += 1
+                    self._conn.execute(
+                        "UPDATE analysis_jobs SET status = ?, started_at = ?, owner = ?, lease_expires_at = ? "
+                        "WHERE job_id = ?",
+                        (RUNNING, now, self.instance_id, now + self.lease_ttl, row["job_id"])
+                    )
+                    row = self._conn.execute("SELECT * FROM analysis_jobs WHERE job_id = ?", (row["job_id"],)).fetchone()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return row
+
+    def _renew(self, job_id: str) -> bool:
+        """Extend this process's lease on a running job; False if the lease was lost"""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE analysis_jobs SET lease_expires_at = ? WHERE job_id = ? AND status = ? AND owner = ?",
+                (time.time() + self.lease_ttl, job_id, RUNNING, self.instance_id)
+            ).rowcount > 0
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(self.lease_ttl / 3)
+            if not await asyncio.to_thread(self._renew, job_id):
+                print(f"Lost the lease on analysis job {job_id}")
+                return
+
+    def _requeue(self, job_id: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE analysis_jobs SET status = ?, started_at = NULL, owner = NULL, lease_expires_at = NULL "
+                "WHERE job_id = ? AND owner = ?",
+                (QUEUED, job_id, self.instance_id)
+            )
+
+    def _finish(self, job_id: str, status: str, result: Optional[str], error: Optional[str]) -> Optional[sqlite3.Row]:
+        """Record the outcome, unless the job's lease passed to another process meanwhile"""
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE analysis_jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_expires_at = NULL "
+                "WHERE job_id = ? AND status = ? AND owner = ?",
+                (status, result, error, time.time(), job_id, RUNNING, self.instance_id)
+            ).rowcount
+            if not updated:
+                return None
+            return self._conn.execute("SELECT * FROM analysis_jobs WHERE job_id = ?", (job_id,)).fetchone()
+
+    async def _worker(self):
+        while True:
+            row = await asyncio.to_thread(self._claim)
+            if row is None:
+                self._wakeup.clear()
+                # Submissions wake the worker at once; polling picks up jobs whose lease expired elsewhere
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.lease_ttl)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run(row)
+
+    async def _run(self, row: sqlite3.Row):
+        result = None
+        error = None
+        heartbeat = asyncio.create_task(self._heartbeat(row["job_id"]))
+        try:
+            # Queued jobs yield model capacity to chat and on-demand analyses, and wait for it
+            # rather than failing: the worker count already bounds how many calls they queue
+            with request_class(BACKGROUND, wait=True):
+                user_preferences = await PreferencesService.analyze_user(
+                    row["user_id"], refresh=bool(row["refresh"]), full=bool(row["full"])
+                )
+            result = user_preferences.model_dump_json()
+        except LLMOverloaded as e:
+            # Not a failure of the job: put it back and pause this worker until the gateway has room
+            await asyncio.to_thread(self._requeue, row["job_id"])
+            self.requeued += 1
+            await asyncio.sleep(e.retry_after)
+            return
+        except UserDataNotFoundError:
+            error = "User data not found"
+        except httpx.HTTPError as e:
+            error = f"Error fetching user data: {str(e)}"
+        except Exception as e:
+            error = f"Analysis error: {str(e)}"
+        finally:
+            heartbeat.cancel()
+
+        finished = await asyncio.to_thread(self._finish, row["job_id"], SUCCEEDED if error is None else FAILED, result, error)
+        if finished is None:
+            # Another process reclaimed the job after this one stopped renewing; it reports the result
+            return
+        self._total_latencies.append(finished["finished_at"] - finished["created_at"])
+        self._run_latencies.append(finished["finished_at"] - finished["started_at"])
+
+        if finished["callback_url"]:
+            await self._send_callback(finished)
+
+    async def _send_callback(self, row: sqlite3.Row):
+        if not self.callback_allowed(row["callback_url"]):
+            print(f"Skipping callback for analysis job {row['job_id']}: {row['callback_url']} is not an allowed URL")
+            return
+        if self._callback_client is None:
+            self._callback_client = httpx.AsyncClient(timeout=CALLBACK_TIMEOUT, follow_redirects=False)
+        try:
+            response = await self._callback_client.post(row["callback_url"], content=self._to_job(row).model_dump_json(),
+                                                        headers={"Content-Type": "application/json"})
+            response.raise_for_status()
+        except Exception as e:
+            print(f"Error delivering callback for analysis job {row['job_id']}: {e}")
+
+    @staticmethod
+    def _to_job(row: sqlite3.Row, deduplicated: bool = False) -> AnalysisJob:
+        return AnalysisJob(
+            job_id=row["job_id"],
+            user_id=row["user_id"],
+            status=row["status"],
+            created_at=_iso(row["created_at"]),
+            started_at=_iso(row["started_at"]),
+            finished_at=_iso(row["finished_at"]),
+            result=UserPreference.model_validate_json(row["result"]) if row["result"] else None,
+            error=row["error"],
+            deduplicated=deduplicated
+        )
+
+    def _status_counts(self) -> dict:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM analysis_jobs GROUP BY status").fetchall())
+
+    async def stats(self) -> dict:
+        counts = await asyncio.to_thread(self._status_counts)
+        total = list(self._total_latencies)
+        run = list(self._run_latencies)
+        return {
+            "workers": self.workers,
+            "queue_depth": counts.get(QUEUED, 0),
+            "running": counts.get(RUNNING, 0),
+            "succeeded": counts.get(SUCCEEDED, 0),
+            "failed": counts.get(FAILED, 0),
+            "deduplicated": self.deduplicated,
+            "requeued": self.requeued,
+            "reclaimed": self.reclaimed,
+            "latency_seconds": {
+                "samples": len(total),
+                "p50": _percentile(total, 50),
+                "p95": _percentile(total, 95),
+                "p99": _percentile(total, 99)
+            },
+            "run_seconds": {
+                "p50": _percentile(run, 50),
+                "p95": _percentile(run, 95),
+                "p99": _percentile(run, 99)
+            }
+        }
+
+def create_analysis_job_queue(config: Config) -> AnalysisJobQueue:
+    """
+    Build the analysis job queue from configuration
+
+    Args:
+        config: Application configuration
+
+    Returns:
+        AnalysisJobQueue: Queue backed by ANALYSIS_JOB_DB_PATH
+    """
+    return AnalysisJobQueue(
+        config.analysis_job_db_path,
+        config.analysis_job_workers,
+        config.analysis_job_retention,
+        config.analysis_job_lease_ttl,
+        config.analysis_job_callback_hosts
+    )
+
+# Shared job queue, built and started in the application lifespan rather than at import
+analysis_job_queue: Optional[AnalysisJobQueue] = None
+
+def get_analysis_job_queue() -> AnalysisJobQueue:
+    """Analysis job queue, built on first use so importing the app opens no database"""
+    global analysis_job_queue
+    if analysis_job_queue is None:
+        analysis_job_queue = create_analysis_job_queue(Config())
+    return analysis_job_queue
+
+async def stop_analysis_job_queue():
+    if analysis_job_queue is not None:
+        await analysis_job_queue.stop()
@@ -0,0 +1,94 @@
+import asyncio
+import time
+from typing import AsyncIterator, Dict, List
+import httpx
+from com.mhire.app.gateway.llm_gateway import BACKGROUND, LLMOverloaded, request_class
+from com.mhire.app.services.preferences.preferences import PreferencesService, UserDataNotFoundError
+
+STAGES = ("fetch", "prepare", "analyze")
+
+async def _analyze_one(user_id: str, refresh: bool, full: bool, stage_totals: Dict[str, float]) -> dict:
+    """Run the analysis pipeline for one user and turn the outcome into an NDJSON record"""
+    timings: Dict[str, float] = {}
+    try:
+        # Batch analyses yield model capacity to chat and on-demand analyses, and wait for it
+        # rather than failing: the batch's concurrency already bounds how many calls it queues
+        with request_class(BACKGROUND, wait=True):
+            user_preferences = await PreferencesService.analyze_user(user_id, refresh=refresh, full=full, timings=timings)
+        record = {"user_id": user_id, "preferences": user_preferences.model_dump()}
+    except LLMOverloaded as e:
+        record = {"user_id": user_id, "status": 503, "error": str(e)}
+    except UserDataNotFoundError:
+        record = {"user_id": user_id, "status": 404, "error": "User data not found"}
+    except httpx.HTTPError as e:
+        record = {"user_id": user_id, "status": 500, "error": f"Error fetching user data: {str(e)}"}
+    except Exception as e:
+        record = {"user_id": user_id, "status": 500, "error": f"Analysis error: {str(e)}"}
+    for stage, seconds in timings.items():
+        stage_totals[stage] += seconds
+    return record
+
+async def run_batch(user_ids: List[str], concurrency: int, refresh: bool = False, full: bool = False) -> AsyncIterator[dict]:
+    """
+    Analyze many users with bounded concurrency, yielding each result as soon as it is ready
+
+    Per-user failures are yielded as error records and do not stop the batch. The last
+    record is a summary with throughput and per-stage timing.
+
+    Args:
+        user_ids: Users to analyze
+        concurrency: Maximum number of users processed at once
+        refresh: Bypass the result cache
+        full: Force a full (non-incremental) re-analysis
+
+    Yields:
+        dict: One record per user, then a summary record
+    """
+    started = time.perf_counter()
+    stage_totals = {stage: 0.0 for stage in STAGES}
+    pending: asyncio.Queue = asyncio.Queue()
+    for user_id in user_ids:
+        pending.put_nowait(user_id)
+    completed: asyncio.Queue = asyncio.Queue()
+
+    async def worker():
+        while True:
+            try:
+                user_id = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            await completed.put(await _analyze_one(user_id, refresh, full, stage_totals))
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, len(user_ids))))]
+    succeeded = 0
+    failed = 0
+    try:
+        for _ in range(len(user_ids)):
+            record = await completed.get()
+            if "error" in record:
+                failed += 1
+            else:
+                succeeded += 1
+            yield record
+    finally:
+        # Stops outstanding work if the consumer goes away mid-batch
+        for task in workers:
+            task.cancel()
+
+    elapsed = time.perf_counter() - started
+    processed = succeeded + failed
+    yield {
+        "summary": {
+            "total": processed,
+            "succeeded": succeeded,
+            "failed": failed,
+            "concurrency": len(workers),
+            "elapsed_seconds": round(elapsed, 3),
+            "users_per_second": round(processed / elapsed, 3) if elapsed else 0.0,
+            "stage_seconds": {stage: round(total, 3) for stage, total in stage_totals.items()},
+            "stage_avg_ms": {
+                stage: round(total * 1000 / processed, 2) if processed else 0.0
+                for stage, total in stage_totals.items()
+            }
+        }
+    }
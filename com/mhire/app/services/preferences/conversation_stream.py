@@ -0,0 +1,78 @@
+from collections import deque
+from typing import AsyncIterator, Optional
+import ijson
+
+USER_INFO_PREFIX = "data.userInfo"
+CONVERSATION_ITEM_PREFIX = "data.conversation.item"
+
+# Conversation fields used by the analysis, by parser prefix
+CONVERSATION_FIELDS = {
+    "data.conversation.item.userMessage.content": ("userMessage", "content"),
+    "data.conversation.item.userMessage.createdAt": ("userMessage", "createdAt"),
+    "data.conversation.item.aiReply.content": ("aiReply", "content"),
+}
+
+async def parse_conversation_tail(chunks: AsyncIterator[bytes], tail: int) -> dict:
+    """
+    Incrementally parse an upstream conversation payload, keeping only the last conversations
+
+    Only userInfo and the fields the analysis reads from a bounded tail of data.conversation
+    are materialized, so memory stays flat as a user's history grows.
+
+    Args:
+        chunks: Raw response body chunks
+        tail: Number of trailing conversations to keep
+
+    Returns:
+        dict: Payload in the upstream shape with the conversation tail, plus "total_conversations"
+    """
+    success = False
+    user_info: Optional[dict] = None
+    conversations = deque(maxlen=tail)
+    total = 0
+    current = None
+    user_info_builder = None
+    user_info_depth = 0
+
+    events = ijson.sendable_list()
+    parser = ijson.parse_coro(events, use_float=True)
+
+    def consume():
+        nonlocal success, user_info, total, current, user_info_builder, user_info_depth
+        for prefix, event, value in events:
+            if user_info_builder is not None:
+                user_info_builder.event(event, value)
+                if event == "start_map" or event == "start_array":
+                    user_info_depth += 1
+                elif event == "end_map" or event == "end_array":
+                    user_info_depth -= 1
+                    if user_info_depth == 0:
+                        user_info = user_info_builder.value
+                        user_info_builder = None
+                continue
+            field = CONVERSATION_FIELDS.get(prefix)
+            if field is not None:
+                current[field[0]][field[1]] = value
+            elif prefix == CONVERSATION_ITEM_PREFIX and event == "start_map":
+                total += 1
+                current = {"userMessage": {}, "aiReply": {}}
+                conversations.append(current)
+            elif prefix == USER_INFO_PREFIX and event == "start_map":
+                user_info_builder = ijson.ObjectBuilder()
+                user_info_builder.event(event, value)
+                user_info_depth = 1
+            elif prefix == "success" and event == "boolean":
+                success = value
+        del events[:]
+
+    async for chunk in chunks:
+        parser.send(chunk)
+        consume()
+    parser.close()
+    consume()
+
+    return {
+        "success": success,
+        "data": {"userInfo": user_info or {}, "conversation": list(conversations)},
+        "total_conversations": total
+    }
@@ -0,0 +1,228 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from com.mhire.app.config.config import Config
+from com.mhire.app.services.preferences.preferences_schema import UserPreference, AnalysisData, AnalysisState
+
+
+class CacheBackend:
+    """Interface for preference cache storage backends"""
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: str):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+class MemoryLRUBackend(CacheBackend):
+    """In-process LRU cache with per-entry TTL"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str):
+        self._entries[key] = (time.time() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def size(self) -> int:
+        return len(self._entries)
+
+class SQLiteBackend(CacheBackend):
+    """Local SQLite cache that survives restarts, evicting least recently used entries"""
+
+    def __init__(self, path: str, max_size: int, ttl: float, table: str = "preference_cache"):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_accessed ON {table} (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl, now)
+            )
+            self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_size,)
+            )
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+class PreferenceCache:
+    """Content-addressed cache of UserPreference results"""
+
+    def __init__(self, backend: CacheBackend, model: str, window: int):
+        self.backend = backend
+        self.model = model
+        # Number of trailing conversations that feed the digest (the prompt builder's window)
+        self.window = window
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def profile_digest(data: AnalysisData) -> str:
+        """Digest of the user profile alone"""
+        return hashlib.sha256(
+            json.dumps(data.user_profile.model_dump(), sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def digest(self, data: AnalysisData) -> str:
+        """
+        Compute a digest of everything the analysis depends on
+
+        Args:
+            data: Prepared analysis data
+
+        Returns:
+            str: Hex digest of the model, user profile and last conversations
+        """
+        hasher = hashlib.sha256()
+        hasher.update(self.model.encode("utf-8"))
+        hasher.update(self.profile_digest(data).encode("utf-8"))
+        for conv in data.conversation_history[-self.window:]:
+            hasher.update(b"\x00")
+            hasher.update(conv.model_dump_json().encode("utf-8"))
+        return hasher.hexdigest()
+
+    def key(self, data: AnalysisData) -> str:
+        return f"{data.user_id}:{self.digest(data)}"
+
+    def get(self, data: AnalysisData) -> Optional[UserPreference]:
+        """Return the cached preferences for this exact input, if any"""
+        value = self.backend.get(self.key(data))
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return UserPreference.model_validate_json(value)
+
+    def set(self, data: AnalysisData, preferences: UserPreference):
+        """Store the preferences computed for this exact input"""
+        self.backend.set(self.key(data), preferences.model_dump_json())
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "size": self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+class AnalysisStateStore:
+    """Per-user store of the last UserPreference and its high-water mark"""
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+
+    def get(self, user_id: str) -> Optional[AnalysisState]:
+        value = self.backend.get(user_id)
+        if value is None:
+            return None
+        return AnalysisState.model_validate_json(value)
+
+    def set(self, user_id: str, state: AnalysisState):
+        self.backend.set(user_id, state.model_dump_json())
+
+    def size(self) -> int:
+        return self.backend.size()
+
+def _create_backend(config: Config, table: str) -> CacheBackend:
+    if config.preference_cache_backend == "sqlite":
+        return SQLiteBackend(config.preference_cache_path, config.preference_cache_max_size, config.preference_cache_ttl, table=table)
+    if config.preference_cache_backend == "memory":
+        return MemoryLRUBackend(config.preference_cache_max_size, config.preference_cache_ttl)
+    raise ValueError(f"Unknown PREFERENCE_CACHE_BACKEND: {config.preference_cache_backend}")
+
+def create_preference_cache(config: Config) -> PreferenceCache:
+    """
+    Build the preference cache for the configured backend
+
+    Args:
+        config: Application configuration
+
+    Returns:
+        PreferenceCache: Cache using the memory or SQLite backend
+    """
+    return PreferenceCache(
+        _create_backend(config, "preference_cache"),
+        config.openai_model,
+        config.preference_prompt_max_conversations
+    )
+
+def create_analysis_state_store(config: Config) -> AnalysisStateStore:
+    """
+    Build the incremental analysis state store for the configured backend
+
+    Args:
+        config: Application configuration
+
+    Returns:
+        AnalysisStateStore: State store using the memory or SQLite backend
+    """
+    return AnalysisStateStore(_create_backend(config, "preference_state"))
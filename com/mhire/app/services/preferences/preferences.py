@@ -1,19 +1,52 @@
-import httpx
 import json
+import httpx
+import time
 from datetime import datetime
-from openai import OpenAI
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from com.mhire.app.config.config import Config
-from com.mhire.app.services.preferences.preferences_schema import UserPreference, AnalysisData, ConversationMessage, UserProfile
+from com.mhire.app.gateway.llm_gateway import PREFERENCES, LLMOverloaded, llm_gateway, request_options
+from com.mhire.app.services.preferences.preferences_schema import UserPreference, AnalysisData, AnalysisState, ConversationMessage, UserProfile
+from com.mhire.app.services.preferences.upstream_client import UpstreamClient
+from com.mhire.app.services.preferences.single_flight import SingleFlight
+from com.mhire.app.services.preferences.conversation_stream import parse_conversation_tail
+from com.mhire.app.services.preferences.prompt_builder import PreferencePromptBuilder, SYSTEM_MESSAGE
+from com.mhire.app.services.preferences.preference_cache import create_preference_cache, create_analysis_state_store
 
 # Initialize configuration
 config = Config()
 
-# OpenAI client initialization
-openai_client = OpenAI(api_key=config.openai_api_key) if config.openai_api_key else None
+# Async OpenAI client (never blocks the event loop during the LLM round-trip), created on
+# first use so that importing this module does not load the openai package. It uses the
+# gateway's pooled connections; retries are left to the gateway.
+openai_client = None
+
+def get_openai_client():
+    global openai_client
+    if openai_client is None and config.openai_api_key:
+        from openai import AsyncOpenAI
+        openai_client = AsyncOpenAI(
+            api_key=config.openai_api_key,
+            http_client=llm_gateway.http_client(),
+            max_retries=0
+        )
+    return openai_client
+
+# Cache of analysis results keyed by user and input digest
+preference_cache = create_preference_cache(config)
+
+# Last analysis result and high-water mark per user for incremental re-analysis
+analysis_state_store = create_analysis_state_store(config)
 
-# External API base URL
-EXISTING_API_BASE = "http://168.231.82.17:5000"
+# Token-budgeted prompt builder for preference extraction
+prompt_builder = PreferencePromptBuilder(config.preference_prompt_token_budget, config.preference_prompt_max_conversations)
+
+# In-process request coalescing for upstream fetches and analyses
+fetch_flight = SingleFlight("fetch")
+analysis_flight = SingleFlight("analysis")
+
+class UserDataNotFoundError(Exception):
+    """Raised when the upstream API has no conversation data for a user"""
+    pass
 
 class PreferencesService:
     """Service class for handling user preference analysis"""
@@ -29,10 +62,59 @@ class PreferencesService:
         Returns:
             dict: API response with user data and conversations
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{EXISTING_API_BASE}/api/v1/chats/ai-conversation/{user_id}")
+        # Concurrent callers for the same user share one upstream request
+        return await fetch_flight.do(user_id, lambda: PreferencesService._fetch_user_conversations(user_id))
+    
+    @staticmethod
+    async def _fetch_user_conversations(user_id: str) -> dict:
+        client = UpstreamClient.get()
+        response = await client.get(f"/api/v1/chats/ai-conversation/{user_id}")
+        response.raise_for_status()
+        return response.json()
+    
+    @staticmethod
+    async def open_user_conversations_stream(user_id: str) -> httpx.Response:
+        """
+        Open the upstream conversation response without reading or decoding the body
+        
+        Args:
+            user_id: User ID to fetch conversations for
+            
+        Returns:
+            httpx.Response: Open streaming response; the caller must close it
+            
+        Raises:
+            httpx.HTTPError: On transport errors or a non-success upstream status
+        """
+        client = UpstreamClient.get()
+        request = client.build_request("GET", f"/api/v1/chats/ai-conversation/{user_id}")
+        response = await client.send(request, stream=True)
+        try:
+            response.raise_for_status()
+        except httpx.HTTPError:
+            await response.aclose()
+            raise
+        return response
+    
+    @staticmethod
+    async def fetch_conversation_tail(user_id: str) -> dict:
+        """
+        Fetch a user's profile and only the most recent conversations, parsing the response incrementally
+        
+        Args:
+            user_id: User ID to fetch conversations for
+            
+        Returns:
+            dict: API response shape with a bounded conversation tail and "total_conversations"
+        """
+        return await fetch_flight.do(("tail", user_id), lambda: PreferencesService._fetch_conversation_tail(user_id))
+    
+    @staticmethod
+    async def _fetch_conversation_tail(user_id: str) -> dict:
+        client = UpstreamClient.get()
+        async with client.stream("GET", f"/api/v1/chats/ai-conversation/{user_id}") as response:
             response.raise_for_status()
-            return response.json()
+            return await parse_conversation_tail(response.aiter_bytes(), config.preference_prompt_max_conversations)
     
     @staticmethod
     async def fetch_user_messages_only(user_id: str) -> dict:
@@ -45,20 +127,20 @@ class PreferencesService:
         Returns:
             dict: Simplified response with messages only
         """
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{EXISTING_API_BASE}/api/v1/chats/ai-conversation/{user_id}")
-            response.raise_for_status()
-            data = response.json()
-            
-            if data.get("success"):
-                return {
-                    "success": True,
-                    "user_id": user_id,
-                    "messages": data["data"]["conversation"],
-                    "total_messages": len(data["data"]["conversation"])
-                }
-            else:
-                return {"success": False, "error": "User conversations not found"}
+        client = UpstreamClient.get()
+        response = await client.get(f"/api/v1/chats/ai-conversation/{user_id}")
+        response.raise_for_status()
+        data = response.json()
+        
+        if data.get("success"):
+            return {
+                "success": True,
+                "user_id": user_id,
+                "messages": data["data"]["conversation"],
+                "total_messages": len(data["data"]["conversation"])
+            }
+        else:
+            return {"success": False, "error": "User conversations not found"}
     
     @staticmethod
     def prepare_analysis_data(user_id: str, user_data: dict) -> AnalysisData:
@@ -74,6 +156,9 @@ class PreferencesService:
         """
         user_info = user_data["data"]["userInfo"]
         conversations = user_data["data"]["conversation"]
+        # Only the analysis window is converted; streamed payloads already carry the full count
+        total_conversations = user_data.get("total_conversations", len(conversations))
+        conversations = conversations[-config.preference_prompt_max_conversations:]
         
         user_profile = UserProfile(
             name=user_info.get("name"),
@@ -98,9 +183,123 @@ class PreferencesService:
             user_id=user_id,
             user_profile=user_profile,
             conversation_history=conversation_history,
-            total_conversations=len(conversations)
+            total_conversations=total_conversations
         )
     
+    @staticmethod
+    async def analyze_user(user_id: str, refresh: bool = False, full: bool = False,
+                           timings: Optional[Dict[str, float]] = None) -> UserPreference:
+        """
+        Fetch, prepare and analyze a user's conversations, serving cached results when the input is unchanged
+        
+        When a previous analysis exists, only conversations newer than its high-water mark are sent
+        to the model together with the previous preferences (incremental mode).
+        
+        Args:
+            user_id: User ID to analyze
+            refresh: Bypass the result cache and re-run the analysis
+            full: Ignore the previous analysis and re-analyze the whole history (implies refresh)
+            timings: Optional dict that receives the seconds spent in the fetch, prepare and analyze stages
+            
+        Returns:
+            UserPreference: Extracted user preferences
+            
+        Raises:
+            UserDataNotFoundError: If the upstream API has no data for the user
+        """
+        # Concurrent callers for the same user and options share one analysis. The shared call runs
+        # in its first caller's priority class, so only callers of the same class may join it: an
+        # on-demand request must not wait behind, or fail with, a batch or job analysis
+        return await analysis_flight.do(
+            (user_id, refresh, full, request_options()),
+            lambda: PreferencesService._analyze_user(user_id, refresh, full, timings)
+        )
+    
+    @staticmethod
+    async def _analyze_user(user_id: str, refresh: bool, full: bool,
+                            timings: Optional[Dict[str, float]]) -> UserPreference:
+        timings = timings if timings is not None else {}
+        started = time.perf_counter()
+        user_data = await PreferencesService.fetch_conversation_tail(user_id)
+        timings["fetch"] = time.perf_counter() - started
+        
+        if not user_data.get("success"):
+            raise UserDataNotFoundError(f"User data not found: {user_id}")
+        
+        started = time.perf_counter()
+        analysis_data = PreferencesService.prepare_analysis_data(user_id, user_data)
+        timings["prepare"] = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        try:
+            return await PreferencesService._analyze_prepared(analysis_data, refresh, full)
+        finally:
+            timings["analyze"] = time.perf_counter() - started
+    
+    @staticmethod
+    async def _analyze_prepared(analysis_data: AnalysisData, refresh: bool, full: bool) -> UserPreference:
+        """
+        Analysis stage of analyze_user: cache lookup, then incremental or full extraction
+        
+        Args:
+            analysis_data: Prepared analysis data
+            refresh: Bypass the result cache
+            full: Ignore the previous analysis
+            
+        Returns:
+            UserPreference: Extracted user preferences
+        """
+        user_id = analysis_data.user_id
+        if not refresh and not full:
+            cached = preference_cache.get(analysis_data)
+            if cached is not None:
+                return cached
+        
+        profile_digest = preference_cache.profile_digest(analysis_data)
+        previous_state = None
+        if config.preference_incremental and not full:
+            previous_state = analysis_state_store.get(user_id)
+            # A changed profile invalidates the previous result
+            if previous_state is not None and previous_state.profile_digest != profile_digest:
+                previous_state = None
+        
+        if previous_state is not None:
+            # ISO-8601 timestamps from the upstream API compare correctly as strings
+            new_conversations = [
+                conv for conv in analysis_data.conversation_history
+                if conv.timestamp > previous_state.last_timestamp
+            ]
+            incremental_data = analysis_data.model_copy(update={"conversation_history": new_conversations})
+            if new_conversations and not prompt_builder.fits(incremental_data, previous=previous_state.preferences):
+                # New conversations left out of the prompt would never be analyzed once the
+                # high-water mark moves past them, so re-analyze the history instead
+                print(f"{len(new_conversations)} new conversations for {user_id} exceed the prompt budget, running a full analysis")
+                previous_state = None
+        
+        if previous_state is not None:
+            if not new_conversations:
+                user_preferences, from_model = previous_state.preferences, True
+            else:
+                user_preferences, from_model = await PreferencesService._run_analysis(
+                    incremental_data, previous=previous_state.preferences
+                )
+                if not from_model:
+                    # Keep the last good result rather than replacing it with defaults
+                    return previous_state.preferences
+        else:
+            user_preferences, from_model = await PreferencesService._run_analysis(analysis_data)
+        
+        # Fallback defaults are never cached so the next call retries the model
+        if from_model:
+            preference_cache.set(analysis_data, user_preferences)
+            if analysis_data.conversation_history:
+                analysis_state_store.set(user_id, AnalysisState(
+                    preferences=user_preferences,
+                    last_timestamp=max(conv.timestamp for conv in analysis_data.conversation_history),
+                    profile_digest=profile_digest
+                ))
+        return user_preferences
+    
     @staticmethod
     async def analyze_conversations_for_user_preferences(data: AnalysisData) -> UserPreference:
         """
@@ -112,7 +311,26 @@ class PreferencesService:
         Returns:
             UserPreference: Extracted user preferences
         """
-        if not openai_client:
+        user_preferences, _ = await PreferencesService._run_analysis(data)
+        return user_preferences
+    
+    @staticmethod
+    async def _run_analysis(data: AnalysisData, previous: Optional[UserPreference] = None) -> Tuple[UserPreference, bool]:
+        """
+        Run the OpenAI extraction, falling back to default preferences on failure
+        
+        Args:
+            data: Analysis data containing user profile and conversations
+            previous: Preferences from an earlier analysis; when given, data holds only the new conversations
+            
+        Returns:
+            Tuple[UserPreference, bool]: Preferences and whether they came from the model (False for fallback defaults)
+            
+        Raises:
+            LLMOverloaded: The model gateway rejected the call under load
+        """
+        client = get_openai_client()
+        if not client:
             # Fallback to basic preferences if OpenAI is not configured
             return UserPreference(
                 userId=data.user_id,
@@ -134,91 +352,36 @@ class PreferencesService:
                 preferredLanguages=["FRENCH"],
                 incomeMin=30000,
                 incomeMax=100000
-            )
+            ), False
         
         try:
-            # Prepare conversation text from last 100 conversations
-            conversation_text = ""
-            conversations_to_analyze = data.conversation_history[-100:]  # Last 100 conversations
-            
-            for i, conv in enumerate(conversations_to_analyze):
-                conversation_text += f"\n--- Conversation {i+1} ---\n"
-                conversation_text += f"Utilisateur: {conv.user_message}\n"
-                conversation_text += f"Assistant IA: {conv.ai_reply}\n"
-            
-            # Create French-optimized UserPreference extraction prompt
-            prompt = f"""
-            Analysez l'historique de conversation suivant et extrayez les préférences utilisateur pour une plateforme de rencontres/matchmaking.
-            La conversation est entre un UTILISATEUR et un assistant IA discutant des préférences de rencontres et des objectifs relationnels.
-            
-            IMPORTANT: Les conversations sont principalement en français. Comprenez les nuances culturelles françaises, l'argot, les expressions romantiques et les normes de rencontres françaises.
-
-            PROFIL UTILISATEUR:
-            - Nom: {data.user_profile.name}
-            - Âge/Date de naissance: {data.user_profile.age}
-            - Genre: {data.user_profile.gender}
-            - Statut relationnel: {data.user_profile.relationship_status}
-            - Profession: {data.user_profile.profession}
-            - Intéressé par: {data.user_profile.interested_in}
-
-            HISTORIQUE DE CONVERSATION ({len(conversations_to_analyze)} conversations analysées):
-            {conversation_text}
-
-            Basé sur cette conversation, extrayez et retournez un objet JSON avec la structure EXACTE suivante et les valeurs enum valides:
-
-            {{
-                "userId": "{data.user_id}",
-                "interestedIn": ["MALE", "FEMALE", "OTHER"],
-                "ageRangeMin": number,
-                "ageRangeMax": number,
-                "personalityTypes": ["INTROVERT", "EXTROVERT", "AMBIVERT", "ANALYTICAL", "EMOTIONAL", "ADVENTUROUS", "CALM", "FUNNY", "SERIOUS"],
-                "drinking": "YES" | "NO" | "MAYBE",
-                "smoking": "YES" | "NO" | "MAYBE",
-                "relationshipGoals": ["CASUAL", "LONG_TERM", "MARRIAGE", "FRIENDSHIP"],
-                "religionPreference": ["ISLAM", "HINDUISM", "CHRISTIANITY", "BUDDHISM", "ATHEIST", "AGNOSTIC", "OTHER"],
-                "educationPreference": ["HIGH_SCHOOL", "BACHELORS", "MASTERS", "DOCTORATE", "DIPLOMA", "OTHER"],
-                "lifestylePreferences": ["FITNESS", "TRAVEL", "NIGHTLIFE", "FAMILY_ORIENTED", "VEGAN", "PET_LOVER", "TECH_SAVVY", "NATURE_LOVER"],
-                "hasChildren": "YES" | "NO" | "MAYBE",
-                "wantsChildren": "YES" | "NO" | "MAYBE",
-                "openToLongDistance": true | false,
-                "politicalView": "LIBERAL" | "CONSERVATIVE" | "MODERATE" | "APOLITICAL" | "OTHER",
-                "loveLanguage": ["WORDS_OF_AFFIRMATION", "ACTS_OF_SERVICE", "RECEIVING_GIFTS", "QUALITY_TIME", "PHYSICAL_TOUCH"],
-                "preferredLanguages": ["ENGLISH", "BENGALI", "HINDI", "ARABIC", "FRENCH", "SPANISH", "MANDARIN", "OTHER"],
-                "incomeMin": number,
-                "incomeMax": number
-            }}
-
-            INSTRUCTIONS IMPORTANTES:
-            1. Analysez attentivement les messages de l'UTILISATEUR pour comprendre leurs préférences
-            2. Utilisez SEULEMENT les valeurs enum fournies ci-dessus - ne créez pas de nouvelles valeurs
-            3. Comprenez les expressions françaises comme "avoir le coup de foudre", "chercher l'âme sœur", "relation sérieuse", "aventure", etc.
-            4. Tenez compte de la culture française des rencontres (importance de la conversation, romantisme, etc.)
-            5. Les tranches d'âge doivent être réalistes (ageRangeMin ≥ 18, ageRangeMax ≥ ageRangeMin)
-            6. Les tranches de revenus doivent être en EUR et réalistes pour le contexte français
-            7. Les tableaux peuvent contenir plusieurs valeurs le cas échéant
-            8. Retournez SEULEMENT l'objet JSON, pas de texte supplémentaire ou de formatage markdown
-            9. Concentrez-vous sur l'extraction des préférences des messages UTILISATEUR, pas des réponses IA
-            10. Si l'utilisateur mentionne "FRENCH" ou parle français, incluez "FRENCH" dans preferredLanguages
-
-            Extrayez ce que l'utilisateur recherche chez un partenaire et ses propres caractéristiques qui influencent ses préférences.
-            Considérez les nuances culturelles françaises dans l'interprétation des préférences relationnelles.
-            """
+            # Build the prompt newest-first within the token budget, static instructions first
+            prompt_build = prompt_builder.build(data, previous=previous)
+            print(
+                f"Preference prompt for {data.user_id}: ~{prompt_build.estimated_tokens} tokens, "
+                f"{prompt_build.conversations_included}/{len(data.conversation_history)} conversations"
+                f"{' (incremental)' if previous is not None else ''}"
+            )
 
-            # Call OpenAI API with configured model
-            response = openai_client.chat.completions.create(
-                model=config.openai_model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Vous êtes un expert en analyse de conversations de rencontres pour extraire les préférences utilisateur. Comprenez parfaitement le français et les nuances culturelles françaises. Retournez seulement du JSON valide correspondant exactement au format UserPreference avec les valeurs enum correctes."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=0.2,  # Lower temperature for more consistent results
-                max_tokens=1500
+            # Call OpenAI API with configured model through the shared gateway
+            response = await llm_gateway.run(
+                PREFERENCES,
+                lambda: client.chat.completions.create(
+                    model=config.openai_model,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": SYSTEM_MESSAGE
+                        },
+                        {
+                            "role": "user",
+                            "content": prompt_build.prompt
+                        }
+                    ],
+                    temperature=0.2,  # Lower temperature for more consistent results
+                    max_tokens=1500
+                ),
+                prompt_build.estimated_tokens + 1500
             )
 
             # Parse AI response
@@ -257,18 +420,25 @@ class PreferencesService:
                     "incomeMax": 60000
                 }
                 
+                # Previous values take precedence over defaults for fields the update omits
+                if previous is not None:
+                    default_preferences.update(previous.model_dump(exclude_none=True))
+                
                 # Merge AI results with defaults to ensure all fields are present
                 for key, default_value in default_preferences.items():
                     if key not in preferences_dict or preferences_dict[key] is None:
                         preferences_dict[key] = default_value
                 
+                # The prompt's static schema has no user id, so it is always taken from the request
+                preferences_dict["userId"] = data.user_id
+                
                 # Validate age ranges
                 if preferences_dict["ageRangeMin"] < 18:
                     preferences_dict["ageRangeMin"] = 18
                 if preferences_dict["ageRangeMax"] < preferences_dict["ageRangeMin"]:
                     preferences_dict["ageRangeMax"] = preferences_dict["ageRangeMin"] + 10
                 
-                return UserPreference(**preferences_dict)
+                return UserPreference(**preferences_dict), True
                 
             except json.JSONDecodeError as e:
                 print(f"Error parsing AI response as JSON: {e}")
@@ -294,8 +464,11 @@ class PreferencesService:
                     preferredLanguages=["FRENCH"],
                     incomeMin=25000,
                     incomeMax=60000
-                )
+                ), False
                 
+        except LLMOverloaded:
+            # Shed load rather than answering with defaults; callers get a 503
+            raise
         except Exception as e:
             print(f"Error calling OpenAI API: {e}")
             # Return French-appropriate default preferences if API call fails
@@ -319,4 +492,4 @@ class PreferencesService:
                 preferredLanguages=["FRENCH"],
                 incomeMin=25000,
                 incomeMax=60000
-            )
\ No newline at end of file
+            ), False
\ No newline at end of file
@@ -1,15 +1,35 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from datetime import datetime
+import json
 import httpx
-from com.mhire.app.services.preferences.preferences import PreferencesService
+from com.mhire.app.config.config import Config
+from com.mhire.app.gateway.llm_gateway import LLMOverloaded
+from com.mhire.app.services.preferences.batch_analysis import run_batch
+from com.mhire.app.services.preferences.analysis_jobs import get_analysis_job_queue
+from com.mhire.app.services.preferences.preferences import (
+    PreferencesService,
+    UserDataNotFoundError,
+    preference_cache,
+    analysis_state_store,
+    fetch_flight,
+    analysis_flight,
+    prompt_builder
+)
 from com.mhire.app.services.preferences.preferences_schema import (
     UserPreferenceResponse, 
     ConversationResponse, 
     DataAnalyzed,
     ErrorResponse,
-    UserPreference
+    UserPreference,
+    BatchAnalyzeRequest,
+    AnalysisJobRequest,
+    AnalysisJob
 )
 
+config = Config()
+
 # Create router instance
 router = APIRouter(prefix="/api/v1/chats", tags=["User Preferences"])
 
@@ -20,6 +40,19 @@ async def get_user_conversations(user_id: str):
     This matches your existing API structure
     """
     try:
+        if config.conversation_passthrough:
+            # Stream the upstream bytes as-is instead of decoding and re-encoding the document
+            upstream = await PreferencesService.open_user_conversations_stream(user_id)
+            headers = {}
+            if "content-encoding" in upstream.headers:
+                headers["Content-Encoding"] = upstream.headers["content-encoding"]
+            return StreamingResponse(
+                upstream.aiter_raw(),
+                status_code=upstream.status_code,
+                media_type=upstream.headers.get("content-type", "application/json"),
+                headers=headers,
+                background=BackgroundTask(upstream.aclose)
+            )
         result = await PreferencesService.fetch_user_conversations(user_id)
         return result
     except httpx.HTTPError as e:
@@ -53,33 +86,92 @@ async def get_user_messages_only(user_id: str):
         raise HTTPException(status_code=500, detail=f"Unexpected error: {str(e)}")
 
 @router.get("/analyze/{user_id}", response_model=UserPreference)
-async def analyze_user_conversations(user_id: str):
+async def analyze_user_conversations(user_id: str, refresh: bool = False, full: bool = False):
     """
     POST method that:
     1. Takes user_id from URL path
     2. Automatically fetches all user data from the existing endpoint
-    3. Analyzes last 100 conversations using OpenAI
+    3. Analyzes the most recent conversations that fit the prompt token budget using OpenAI
     4. Returns UserPreference format response
+    
+    Results are cached per user and conversation digest; pass ?refresh=true to bypass the cache.
+    Later runs only send new conversations to the model; pass ?full=true for a full re-analysis.
     """
     try:
-        # Step 1: Automatically fetch user data using the user_id
-        user_data = await PreferencesService.fetch_user_conversations(user_id)
-        
-        if not user_data.get("success"):
-            raise HTTPException(status_code=404, detail="User data not found")
-        
-        # Step 2: Prepare data for AI analysis
-        analysis_data = PreferencesService.prepare_analysis_data(user_id, user_data)
-        
-        # Step 3: Analyze conversations using OpenAI
-        user_preferences = await PreferencesService.analyze_conversations_for_user_preferences(analysis_data)
-        
-        # Return user preferences directly
-        return user_preferences
+        return await PreferencesService.analyze_user(user_id, refresh=refresh, full=full)
         
+    except UserDataNotFoundError:
+        raise HTTPException(status_code=404, detail="User data not found")
     except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"Error fetching user data: {str(e)}")
-    except HTTPException:
+    except (HTTPException, LLMOverloaded):
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Analysis error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Analysis error: {str(e)}")
+
+@router.post("/analyze/batch")
+async def analyze_users_batch(request: BatchAnalyzeRequest):
+    """
+    Analyze many users in one call and stream results as NDJSON
+    
+    Each line is either {"user_id", "preferences"} or {"user_id", "status", "error"}, in completion order.
+    The last line is {"summary": ...} with throughput and per-stage timing.
+    """
+    concurrency = min(request.concurrency or config.batch_analyze_concurrency, config.batch_analyze_max_concurrency)
+    
+    async def ndjson_lines():
+        async for record in run_batch(request.user_ids, concurrency, refresh=request.refresh, full=request.full):
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+@router.post("/jobs", response_model=AnalysisJob, status_code=202)
+async def submit_analysis_job(request: AnalysisJobRequest):
+    """
+    Queue a preference analysis and return its job ID immediately
+    
+    If an analysis for the same user is already queued or running, that job is returned instead.
+    Poll GET /jobs/{job_id} for the result, or pass callback_url to be notified on completion.
+    """
+    queue = get_analysis_job_queue()
+    callback_url = str(request.callback_url) if request.callback_url is not None else None
+    if callback_url is not None and not queue.callback_allowed(callback_url):
+        raise HTTPException(status_code=400, detail="callback_url host is not allowed")
+    return await queue.submit(
+        request.user_id,
+        refresh=request.refresh,
+        full=request.full,
+        callback_url=callback_url
+    )
+
+@router.get("/jobs/stats")
+async def get_analysis_job_stats():
+    """
+    Queue depth and job latency percentiles
+    """
+    return await get_analysis_job_queue().stats()
+
+@router.get("/jobs/{job_id}", response_model=AnalysisJob)
+async def get_analysis_job(job_id: str):
+    """
+    Status of an analysis job, with the UserPreference once it has succeeded
+    """
+    job = await get_analysis_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/stats")
+async def get_preferences_stats():
+    """
+    Runtime statistics for the preferences service
+    """
+    return {
+        "cache": preference_cache.stats(),
+        "incremental_states": analysis_state_store.size(),
+        "prompt": prompt_builder.stats(),
+        "single_flight": {
+            "fetch": fetch_flight.stats(),
+            "analysis": analysis_flight.stats()
+        }
+    }
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, HttpUrl
 from typing import List, Optional, Literal
 from datetime import datetime
 
@@ -59,6 +59,45 @@ class AnalysisData(BaseModel):
     conversation_history: List[ConversationMessage]
     total_conversations: int
 
+class AnalysisState(BaseModel):
+    """Last analysis result for a user, used for incremental re-analysis"""
+    preferences: UserPreference
+    last_timestamp: str
+    profile_digest: str
+
+class BatchAnalyzeRequest(BaseModel):
+    """Request model for bulk preference analysis"""
+    user_ids: List[str] = Field(min_length=1)
+    concurrency: Optional[int] = Field(default=None, ge=1, description="Users analyzed at once (defaults to BATCH_ANALYZE_CONCURRENCY)")
+    refresh: bool = False
+    full: bool = False
+
+class PromptBuild(BaseModel):
+    """Preference extraction prompt with its size estimate"""
+    prompt: str
+    estimated_tokens: int
+    conversations_included: int
+    conversations_dropped: int
+
+class AnalysisJobRequest(BaseModel):
+    """Request model for submitting an asynchronous analysis job"""
+    user_id: str
+    refresh: bool = False
+    full: bool = False
+    callback_url: Optional[HttpUrl] = Field(default=None, description="Absolute http(s) URL that receives the finished job as a JSON POST")
+
+class AnalysisJob(BaseModel):
+    """Status and result of an asynchronous analysis job"""
+    job_id: str
+    user_id: str
+    status: Literal["queued", "running", "succeeded", "failed"]
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    result: Optional[UserPreference] = None
+    error: Optional[str] = None
+    deduplicated: bool = False
+
 class DataAnalyzed(BaseModel):
     """Metadata about the analysis performed"""
     user_profile: bool
@@ -0,0 +1,197 @@
+from typing import List, Optional
+from com.mhire.app.services.preferences.preferences_schema import AnalysisData, ConversationMessage, UserPreference, PromptBuild
+
+# Static system message for preference extraction
+SYSTEM_MESSAGE = "Vous êtes un expert en analyse de conversations de rencontres pour extraire les préférences utilisateur. Comprenez parfaitement le français et les nuances culturelles françaises. Retournez seulement du JSON valide correspondant exactement au format UserPreference avec les valeurs enum correctes."
+
+# Static instruction block, placed before any per-user content so that the
+# provider's prompt-prefix caching can reuse it across requests
+STATIC_INSTRUCTIONS = """Analysez l'historique de conversation fourni plus bas et extrayez les préférences utilisateur pour une plateforme de rencontres/matchmaking.
+La conversation est entre un UTILISATEUR et un assistant IA discutant des préférences de rencontres et des objectifs relationnels.
+
+IMPORTANT: Les conversations sont principalement en français. Comprenez les nuances culturelles françaises, l'argot, les expressions romantiques et les normes de rencontres françaises.
+
+Basé sur cette conversation, extrayez et retournez un objet JSON avec la structure EXACTE suivante et les valeurs enum valides:
+
+{
+    "userId": "<ID UTILISATEUR indiqué plus bas>",
+    "interestedIn": ["MALE", "FEMALE", "OTHER"],
+    "ageRangeMin": number,
+    "ageRangeMax": number,
+    "personalityTypes": ["INTROVERT", "EXTROVERT", "AMBIVERT", "ANALYTICAL", "EMOTIONAL", "ADVENTUROUS", "CALM", "FUNNY", "SERIOUS"],
+    "drinking": "YES" | "NO" | "MAYBE",
+    "smoking": "YES" | "NO" | "MAYBE",
+    "relationshipGoals": ["CASUAL", "LONG_TERM", "MARRIAGE", "FRIENDSHIP"],
+    "religionPreference": ["ISLAM", "HINDUISM", "CHRISTIANITY", "BUDDHISM", "ATHEIST", "AGNOSTIC", "OTHER"],
+    "educationPreference": ["HIGH_SCHOOL", "BACHELORS", "MASTERS", "DOCTORATE", "DIPLOMA", "OTHER"],
+    "lifestylePreferences": ["FITNESS", "TRAVEL", "NIGHTLIFE", "FAMILY_ORIENTED", "VEGAN", "PET_LOVER", "TECH_SAVVY", "NATURE_LOVER"],
+    "hasChildren": "YES" | "NO" | "MAYBE",
+    "wantsChildren": "YES" | "NO" | "MAYBE",
+    "openToLongDistance": true | false,
+    "politicalView": "LIBERAL" | "CONSERVATIVE" | "MODERATE" | "APOLITICAL" | "OTHER",
+    "loveLanguage": ["WORDS_OF_AFFIRMATION", "ACTS_OF_SERVICE", "RECEIVING_GIFTS", "QUALITY_TIME", "PHYSICAL_TOUCH"],
+    "preferredLanguages": ["ENGLISH", "BENGALI", "HINDI", "ARABIC", "FRENCH", "SPANISH", "MANDARIN", "OTHER"],
+    "incomeMin": number,
+    "incomeMax": number
+}
+
+INSTRUCTIONS IMPORTANTES:
+1. Analysez attentivement les messages de l'UTILISATEUR pour comprendre leurs préférences
+2. Utilisez SEULEMENT les valeurs enum fournies ci-dessus - ne créez pas de nouvelles valeurs
+3. Comprenez les expressions françaises comme "avoir le coup de foudre", "chercher l'âme sœur", "relation sérieuse", "aventure", etc.
+4. Tenez compte de la culture française des rencontres (importance de la conversation, romantisme, etc.)
+5. Les tranches d'âge doivent être réalistes (ageRangeMin ≥ 18, ageRangeMax ≥ ageRangeMin)
+6. Les tranches de revenus doivent être en EUR et réalistes pour le contexte français
+7. Les tableaux peuvent contenir plusieurs valeurs le cas échéant
+8. Retournez SEULEMENT l'objet JSON, pas de texte supplémentaire ou de formatage markdown
+9. Concentrez-vous sur l'extraction des préférences des messages UTILISATEUR, pas des réponses IA
+10. Si l'utilisateur mentionne "FRENCH" ou parle français, incluez "FRENCH" dans preferredLanguages
+
+Extrayez ce que l'utilisateur recherche chez un partenaire et ses propres caractéristiques qui influencent ses préférences.
+Considérez les nuances culturelles françaises dans l'interprétation des préférences relationnelles.
+"""
+
+# Average characters per token for mixed French/English text
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate that does not need a tokenizer"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+STATIC_TOKENS = estimate_tokens(SYSTEM_MESSAGE) + estimate_tokens(STATIC_INSTRUCTIONS)
+
+# Allowance for the "--- Conversation N ---" separator added to each selected conversation
+SEPARATOR_TOKENS = estimate_tokens("\n--- Conversation 0000 ---\n")
+
+class PreferencePromptBuilder:
+    """Builds the preference extraction prompt within a token budget"""
+
+    def __init__(self, token_budget: int, max_conversations: int):
+        self.token_budget = token_budget
+        self.max_conversations = max_conversations
+        self.prompts_built = 0
+        self.total_estimated_tokens = 0
+        self.last_estimated_tokens = 0
+        self.conversations_included = 0
+        self.conversations_dropped = 0
+
+    @staticmethod
+    def _format_conversation(conv: ConversationMessage) -> str:
+        return f"Utilisateur: {conv.user_message}\nAssistant IA: {conv.ai_reply}\n"
+
+    def select_conversations(self, history: List[ConversationMessage], budget: int) -> List[str]:
+        """
+        Pick formatted conversations newest-first until the budget is spent
+
+        Args:
+            history: Conversations in chronological order
+            budget: Token budget for the conversation section
+
+        Returns:
+            List[str]: Formatted conversations in chronological order
+        """
+        selected = []
+        used = 0
+        for conv in reversed(history[-self.max_conversations:]):
+            block = self._format_conversation(conv)
+            tokens = estimate_tokens(block) + SEPARATOR_TOKENS
+            if used + tokens > budget:
+                if not selected:
+                    # Always keep the newest conversation, truncated to the budget
+                    selected.append(block[:max(budget, 0) * CHARS_PER_TOKEN])
+                break
+            selected.append(block)
+            used += tokens
+        selected.reverse()
+        return selected
+
+    @staticmethod
+    def _header(data: AnalysisData, previous: Optional[UserPreference]) -> List[str]:
+        profile = data.user_profile
+        header = [
+            f"\nID UTILISATEUR: {data.user_id}\n",
+            "\nPROFIL UTILISATEUR:\n",
+            f"- Nom: {profile.name}\n",
+            f"- Âge/Date de naissance: {profile.age}\n",
+            f"- Genre: {profile.gender}\n",
+            f"- Statut relationnel: {profile.relationship_status}\n",
+            f"- Profession: {profile.profession}\n",
+            f"- Intéressé par: {profile.interested_in}\n",
+        ]
+        if previous is not None:
+            header.append(
+                "\nPRÉFÉRENCES PRÉCÉDENTES (déjà extraites des conversations plus anciennes):\n"
+                f"{previous.model_dump_json()}\n\n"
+                "Les conversations ci-dessous sont uniquement les NOUVELLES conversations depuis cette analyse.\n"
+                "Mettez à jour les préférences précédentes: conservez les valeurs existantes sauf si les nouvelles conversations les contredisent ou les précisent.\n"
+            )
+        return header
+
+    def fits(self, data: AnalysisData, previous: Optional[UserPreference] = None) -> bool:
+        """
+        Whether every conversation in data fits in the prompt, so none would be dropped
+
+        Args:
+            data: Analysis data; in incremental mode it holds only the new conversations
+            previous: Preferences from an earlier analysis, for incremental updates
+
+        Returns:
+            bool: True if build() would include all conversations untruncated
+        """
+        if len(data.conversation_history) > self.max_conversations:
+            return False
+        header_tokens = sum(estimate_tokens(part) for part in self._header(data, previous))
+        needed = sum(
+            estimate_tokens(self._format_conversation(conv)) + SEPARATOR_TOKENS
+            for conv in data.conversation_history
+        )
+        return needed <= self.token_budget - STATIC_TOKENS - header_tokens
+
+    def build(self, data: AnalysisData, previous: Optional[UserPreference] = None) -> PromptBuild:
+        """
+        Build the user prompt for an analysis
+
+        Args:
+            data: Analysis data; in incremental mode it holds only the new conversations
+            previous: Preferences from an earlier analysis, for incremental updates
+
+        Returns:
+            PromptBuild: Prompt text, token estimate and conversation counts
+        """
+        header = self._header(data, previous)
+        header_tokens = sum(estimate_tokens(part) for part in header)
+
+        conversations = self.select_conversations(
+            data.conversation_history, self.token_budget - STATIC_TOKENS - header_tokens
+        )
+        parts = [STATIC_INSTRUCTIONS, *header, f"\nHISTORIQUE DE CONVERSATION ({len(conversations)} conversations analysées):\n"]
+        for i, block in enumerate(conversations):
+            parts.append(f"\n--- Conversation {i+1} ---\n")
+            parts.append(block)
+        prompt = "".join(parts)
+
+        estimated_tokens = estimate_tokens(SYSTEM_MESSAGE) + estimate_tokens(prompt)
+        dropped = len(data.conversation_history) - len(conversations)
+        self.prompts_built += 1
+        self.total_estimated_tokens += estimated_tokens
+        self.last_estimated_tokens = estimated_tokens
+        self.conversations_included += len(conversations)
+        self.conversations_dropped += dropped
+        return PromptBuild(
+            prompt=prompt,
+            estimated_tokens=estimated_tokens,
+            conversations_included=len(conversations),
+            conversations_dropped=dropped
+        )
+
+    def stats(self) -> dict:
+        return {
+            "token_budget": self.token_budget,
+            "max_conversations": self.max_conversations,
+            "prompts_built": self.prompts_built,
+            "last_estimated_tokens": self.last_estimated_tokens,
+            "avg_estimated_tokens": round(self.total_estimated_tokens / self.prompts_built, 1) if self.prompts_built else 0.0,
+            "total_estimated_tokens": self.total_estimated_tokens,
+            "conversations_included": self.conversations_included,
+            "conversations_dropped": self.conversations_dropped
+        }
@@ -0,0 +1,65 @@
+import importlib.util
+from typing import Optional
+import httpx
+from com.mhire.app.config.config import Config
+
+class UpstreamClient:
+    """Application-scoped pooled HTTP client for the upstream conversation API"""
+
+    _client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    async def startup(cls, config: Config) -> httpx.AsyncClient:
+        """
+        Create the shared client (called from the FastAPI lifespan)
+
+        Args:
+            config: Application configuration with pool and timeout settings
+
+        Returns:
+            httpx.AsyncClient: The shared client
+        """
+        if cls._client is not None:
+            return cls._client
+
+        http2 = config.upstream_http2
+        if http2 and importlib.util.find_spec("h2") is None:
+            print("UPSTREAM_HTTP2 is enabled but the 'h2' package is not installed, falling back to HTTP/1.1")
+            http2 = False
+
+        cls._client = httpx.AsyncClient(
+            base_url=config.upstream_api_base,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=config.upstream_max_connections,
+                max_keepalive_connections=config.upstream_max_keepalive_connections,
+                keepalive_expiry=config.upstream_keepalive_expiry
+            ),
+            timeout=httpx.Timeout(
+                config.upstream_read_timeout,
+                connect=config.upstream_connect_timeout
+            )
+        )
+        return cls._client
+
+    @classmethod
+    async def shutdown(cls):
+        """Close the shared client and release pooled connections"""
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+
+    @classmethod
+    def get(cls) -> httpx.AsyncClient:
+        """
+        Return the shared client
+
+        Returns:
+            httpx.AsyncClient: The shared client
+
+        Raises:
+            RuntimeError: If the client has not been started
+        """
+        if cls._client is None:
+            raise RuntimeError("Upstream HTTP client is not started; it is created in the application lifespan")
+        return cls._client
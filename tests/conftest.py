@@ -0,0 +1,104 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import types
+
+import httpx
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Config is read once per process: point every SQLite file at a scratch directory and the
+# model endpoints at unroutable addresses before any application module is imported
+_DATA_DIR = tempfile.mkdtemp(prefix="mk-tests-")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("OPENAI_ENDPOINT", "http://openai.invalid/v1/chat/completions")
+os.environ.setdefault("UPSTREAM_API_BASE", "http://upstream.invalid")
+os.environ.setdefault("ANALYSIS_JOB_DB_PATH", os.path.join(_DATA_DIR, "analysis_jobs.sqlite3"))
+os.environ.setdefault("NOTIFICATION_DB_PATH", os.path.join(_DATA_DIR, "notifications.sqlite3"))
+os.environ.setdefault("DATE_MATE_SESSION_DB_PATH", os.path.join(_DATA_DIR, "date_mate_sessions.sqlite3"))
+os.environ.setdefault("PREFERENCE_CACHE_PATH", os.path.join(_DATA_DIR, "preference_cache.sqlite3"))
+
+from com.mhire.app.config.config import Config
+from com.mhire.app.gateway.llm_gateway import llm_gateway
+
+def conversation_payload(count: int = 5) -> dict:
+    """Upstream /ai-conversation body with count exchanges"""
+    return {
+        "success": True,
+        "data": {
+            "userInfo": {"name": "Ana", "dob": "1995-04-02", "gender": "FEMALE"},
+            "conversation": [
+                {
+                    "userMessage": {"content": f"message {i}", "createdAt": f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}Z"},
+                    "aiReply": {"content": f"reply {i}"}
+                }
+                for i in range(count)
+            ]
+        }
+    }
+
+class FakeCompletions:
+    """Stand-in for AsyncOpenAI.chat.completions that sleeps like a model round-trip"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        content = json.dumps({"interestedIn": ["MALE"], "ageRangeMin": 25, "ageRangeMax": 35})
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=content))])
+
+class FakeOpenAI:
+    def __init__(self, delay: float):
+        self.chat = types.SimpleNamespace(completions=FakeCompletions(delay))
+
+@pytest.fixture(autouse=True)
+def fresh_gateway():
+    """Each test runs its own event loop, so the gateway's locks and client must not outlive it"""
+    llm_gateway.__init__(Config())
+    yield llm_gateway
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """
+    Serve the upstream conversation API from memory
+
+    Returns:
+        dict: {"calls": int, "delay": float}; the delay is applied to every upstream response
+    """
+    from com.mhire.app.services.preferences.upstream_client import UpstreamClient
+
+    state = {"calls": 0, "delay": 0.0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        state["calls"] += 1
+        await asyncio.sleep(state["delay"])
+        return httpx.Response(200, json=conversation_payload())
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://upstream.invalid")
+    monkeypatch.setattr(UpstreamClient, "_client", client)
+    yield state
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """Replace the preferences OpenAI client with one that takes 0.5s per call"""
+    from com.mhire.app.services.preferences import preferences
+
+    fake = FakeOpenAI(delay=0.5)
+    monkeypatch.setattr(preferences, "openai_client", fake)
+    return fake.chat.completions
+
+@pytest.fixture
+def app_client():
+    """Factory for an HTTP client talking to the application in-process"""
+    from com.mhire.app.main import app
+
+    def make() -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=30)
+    return make
@@ -0,0 +1,112 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+import httpx
+import pytest
+from pydantic import ValidationError
+
+from com.mhire.app.services.preferences.analysis_jobs import QUEUED, RUNNING, SUCCEEDED, AnalysisJobQueue
+from com.mhire.app.services.preferences.preferences_schema import AnalysisJobRequest
+
+def make_queue(path, lease_ttl: float = 60, callback_hosts=None) -> AnalysisJobQueue:
+    # No workers: the test drives claiming itself
+    return AnalysisJobQueue(str(path), workers=0, retention=3600, lease_ttl=lease_ttl, callback_hosts=callback_hosts)
+
+def test_starting_another_process_does_not_take_over_running_jobs(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    first = make_queue(path)
+    job = asyncio.run(first.submit("user-1"))
+    claimed = first._claim()
+    assert claimed["job_id"] == job.job_id
+
+    second = make_queue(path)
+    asyncio.run(second.start())
+
+    assert asyncio.run(second.get(job.job_id)).status == RUNNING
+    assert second._claim() is None
+    assert first._renew(job.job_id)
+
+def test_job_with_expired_lease_is_reclaimed_and_late_result_ignored(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    first = make_queue(path, lease_ttl=-1)
+    job = asyncio.run(first.submit("user-1"))
+    first._claim()
+
+    second = make_queue(path)
+    reclaimed = second._claim()
+    assert reclaimed["job_id"] == job.job_id
+    assert second.reclaimed == 1
+
+    # The first process lost its lease: its renewal and result are rejected
+    assert not first._renew(job.job_id)
+    assert first._finish(job.job_id, "succeeded", None, None) is None
+    assert second._finish(job.job_id, "failed", None, "boom")["status"] == "failed"
+
+def test_stop_hands_own_running_jobs_back(tmp_path):
+    queue = make_queue(tmp_path / "jobs.sqlite3")
+    job = asyncio.run(queue.submit("user-1"))
+    queue._claim()
+
+    asyncio.run(queue.stop())
+
+    assert asyncio.run(queue.get(job.job_id)).status == QUEUED
+
+@pytest.mark.parametrize("callback_url", ["/api/v1/chats/analyze/u1", "ftp://hooks.example.com/done", "hooks.example.com/done"])
+def test_callback_url_must_be_absolute_http(callback_url):
+    with pytest.raises(ValidationError):
+        AnalysisJobRequest(user_id="user-1", callback_url=callback_url)
+
+def test_callbacks_only_reach_allowed_hosts_through_their_own_client(tmp_path):
+    queue = make_queue(tmp_path / "jobs.sqlite3", callback_hosts=["hooks.example.com"])
+    posted = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        posted.append(str(request.url))
+        return httpx.Response(204)
+
+    assert queue.callback_allowed("https://hooks.example.com/done")
+    assert not queue.callback_allowed("http://10.0.0.5/internal")
+    assert not queue.callback_allowed("/api/v1/chats/analyze/u1")
+
+    async def run():
+        queue._callback_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        for user_id, url in (("user-1", "https://hooks.example.com/done"), ("user-2", "/api/v1/chats/analyze/u1")):
+            # Rows stored before callback URLs were validated may still hold relative URLs
+            await queue.submit(user_id, callback_url=url)
+            row = queue._claim()
+            await queue._send_callback(queue._finish(row["job_id"], SUCCEEDED, None, None))
+        await queue.stop()
+
+    asyncio.run(run())
+
+    assert posted == ["https://hooks.example.com/done"]
+
+def test_submit_waiting_on_another_writer_does_not_block_the_event_loop(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    queue = make_queue(path)
+    other = sqlite3.connect(str(path), isolation_level=None, check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE")
+    threading.Timer(0.3, lambda: other.execute("COMMIT")).start()
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    async def run():
+        task = asyncio.create_task(ticker())
+        started = time.monotonic()
+        job = await queue.submit("user-1")
+        task.cancel()
+        return job, time.monotonic() - started
+
+    job, elapsed = asyncio.run(run())
+
+    assert job.status == QUEUED
+    assert elapsed >= 0.25
+    # The loop kept running while the submission waited for the lock
+    assert ticks >= 10
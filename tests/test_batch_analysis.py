@@ -0,0 +1,23 @@
+import asyncio
+import uuid
+
+from com.mhire.app.config.config import Config
+from com.mhire.app.services.preferences.batch_analysis import run_batch
+
+def test_batch_wider_than_the_background_queue_waits_instead_of_rejecting(upstream, fake_openai, fresh_gateway):
+    """64 users at the maximum batch concurrency, far more than the background queue limit, all succeed"""
+    config = Config()
+    fake_openai.delay = 0.3
+    prefix = uuid.uuid4().hex
+    user_ids = [f"{prefix}-{i}" for i in range(64)]
+    assert config.batch_analyze_max_concurrency > config.llm_background_queue_limit
+
+    async def run():
+        return [record async for record in run_batch(user_ids, config.batch_analyze_max_concurrency, refresh=True)]
+
+    records = asyncio.run(run())
+
+    summary = records[-1]["summary"]
+    assert [record for record in records[:-1] if "error" in record] == []
+    assert summary["succeeded"] == 64
+    assert fresh_gateway.stats()["classes"]["background"]["rejected"] == 0
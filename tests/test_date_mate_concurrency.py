@@ -0,0 +1,67 @@
+import asyncio
+import time
+import types
+import uuid
+
+import pytest
+
+from com.mhire.app.gateway.llm_gateway import DATE_MATE, PriorityGate
+
+class FakeChatModel:
+    """Stand-in for ChatOpenAI.ainvoke that sleeps like a model round-trip and tracks overlap"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def ainvoke(self, messages, **kwargs):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return types.SimpleNamespace(content="Proposez-lui une balade au bord de l'eau.")
+
+@pytest.fixture
+def fake_chat_model(monkeypatch):
+    from com.mhire.app.services.date_mate.date_mate_router import get_date_mate_service
+
+    fake = FakeChatModel(delay=0.5)
+    monkeypatch.setattr(get_date_mate_service(), "llm", fake)
+    return fake
+
+def chat_concurrently(app_client, count: int):
+    prefix = uuid.uuid4().hex
+
+    async def run():
+        async with app_client() as client:
+            started = time.perf_counter()
+            responses = await asyncio.gather(*[
+                client.post("/date-mate/chat", json={"user_id": f"{prefix}-{i}", "message": "Où l'emmener pour un premier rendez-vous ?"})
+                for i in range(count)
+            ])
+            return responses, time.perf_counter() - started
+
+    return asyncio.run(run())
+
+def test_simultaneous_chats_overlap(fake_chat_model, app_client):
+    """10 chats for different users take about as long as one model call, not 10 times as long"""
+    responses, elapsed = chat_concurrently(app_client, 10)
+
+    assert [response.status_code for response in responses] == [200] * 10
+    assert fake_chat_model.calls == 10
+    assert fake_chat_model.max_in_flight == 10
+    assert elapsed < 2 * fake_chat_model.delay
+
+def test_chat_concurrency_cap_bounds_model_calls(fake_chat_model, app_client, fresh_gateway):
+    fresh_gateway._services[DATE_MATE] = PriorityGate(2)
+
+    responses, elapsed = chat_concurrently(app_client, 6)
+
+    assert [response.status_code for response in responses] == [200] * 6
+    assert fake_chat_model.max_in_flight == 2
+    assert elapsed >= 3 * fake_chat_model.delay
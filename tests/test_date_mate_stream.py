@@ -0,0 +1,59 @@
+import asyncio
+import types
+
+from com.mhire.app.config.config import Config
+from com.mhire.app.services.date_mate.date_mate import DateMate
+from com.mhire.app.services.date_mate.date_mate_schema import ChatRequest
+
+MESSAGE = "J'ai un premier rendez-vous samedi et je stresse un peu"
+
+class FakeStreamingModel:
+    """Streams a reply in chunks, sleeping before each one like a model producing tokens"""
+
+    def __init__(self, chunks: int = 10, delay: float = 0.04):
+        self.chunks = chunks
+        self.delay = delay
+
+    async def astream(self, messages, **kwargs):
+        for i in range(self.chunks):
+            await asyncio.sleep(self.delay)
+            yield types.SimpleNamespace(content=f"mot{i} ")
+
+def make_date_mate() -> DateMate:
+    date_mate = DateMate(Config())
+    date_mate.llm = FakeStreamingModel()
+    return date_mate
+
+def test_aborted_stream_leaves_messages_and_topics_unchanged():
+    date_mate = make_date_mate()
+
+    async def run():
+        # An existing session, held live by the in-memory store
+        session = await date_mate.initialize_chat_state("u1")
+        session.messages.extend([{"role": "user", "content": "Salut"}, {"role": "assistant", "content": "Bonjour !"}])
+        await date_mate.session_store.save(session)
+
+        events = date_mate.stream_chat(ChatRequest(user_id="u1", message=MESSAGE))
+        first = await events.__anext__()
+        # The client disconnects after the first token
+        await events.aclose()
+        return first, await date_mate.initialize_chat_state("u1")
+
+    first, session = asyncio.run(run())
+
+    assert first.startswith("data: ")
+    assert len(session.messages) == 2
+    assert session.context["recent_topics"] == []
+
+def test_completed_stream_records_the_turn_and_its_topics():
+    date_mate = make_date_mate()
+
+    async def run():
+        events = [event async for event in date_mate.stream_chat(ChatRequest(user_id="u2", message=MESSAGE))]
+        return events, await date_mate.initialize_chat_state("u2")
+
+    events, session = asyncio.run(run())
+
+    assert events[-1].startswith("event: done")
+    assert [message["role"] for message in session.messages] == ["user", "assistant"]
+    assert session.context["recent_topics"] == ["date"]
@@ -0,0 +1,43 @@
+import asyncio
+import uuid
+
+from conftest import conversation_payload
+
+from com.mhire.app.services.preferences import preferences
+from com.mhire.app.services.preferences.preferences import PreferencesService, analysis_state_store, preference_cache
+from com.mhire.app.services.preferences.preferences_schema import AnalysisState, UserPreference
+from com.mhire.app.services.preferences.prompt_builder import STATIC_TOKENS
+
+def analyze_after_previous(monkeypatch, conversations: int) -> list:
+    """Analyze a user whose previous result covers the first 5 conversations; returns the model calls made"""
+    user_id = uuid.uuid4().hex
+    data = PreferencesService.prepare_analysis_data(user_id, conversation_payload(conversations))
+    previous = UserPreference(userId=user_id, interestedIn=["FEMALE"], ageRangeMin=25, ageRangeMax=30)
+    analysis_state_store.set(user_id, AnalysisState(
+        preferences=previous,
+        last_timestamp=data.conversation_history[4].timestamp,
+        profile_digest=preference_cache.profile_digest(data)
+    ))
+    calls = []
+
+    async def run_analysis(data, previous=None):
+        calls.append((len(data.conversation_history), previous))
+        return UserPreference(userId=data.user_id, interestedIn=["MALE"], ageRangeMin=25, ageRangeMax=35), True
+
+    monkeypatch.setattr(PreferencesService, "_run_analysis", staticmethod(run_analysis))
+    # Room for the profile, the previous preferences and about 20 short conversations
+    monkeypatch.setattr(preferences.prompt_builder, "token_budget", STATIC_TOKENS + 600)
+    asyncio.run(PreferencesService._analyze_prepared(data, refresh=True, full=False))
+    return calls
+
+def test_new_conversations_within_budget_are_analyzed_incrementally(monkeypatch):
+    calls = analyze_after_previous(monkeypatch, conversations=10)
+
+    assert len(calls) == 1
+    assert calls[0][0] == 5
+    assert calls[0][1] is not None
+
+def test_new_conversations_over_budget_fall_back_to_a_full_analysis(monkeypatch):
+    calls = analyze_after_previous(monkeypatch, conversations=200)
+
+    assert calls == [(200, None)]
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from com.mhire.app.config.config import Config
+from com.mhire.app.gateway.llm_gateway import (
+    ANALYSIS,
+    BACKGROUND,
+    DATE_MATE,
+    INTERACTIVE,
+    PREFERENCES,
+    PRIORITY_CLASSES,
+    LLMGateway,
+    LLMOverloaded,
+    NOTIFICATION,
+    TokenBucket,
+    request_class
+)
+
+def test_analysis_call_overtakes_queued_background_calls_at_the_service_limit():
+    config = Config()
+    gateway = LLMGateway(config)
+    gateway._queue_limits[BACKGROUND] = 64
+    finished = []
+
+    async def call(name: str):
+        async def model_call():
+            await asyncio.sleep(0.01)
+            finished.append(name)
+        with request_class(name):
+            await gateway.run(PREFERENCES, model_call, tokens=100)
+
+    async def run():
+        tasks = [asyncio.create_task(call(BACKGROUND)) for _ in range(24)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(call(ANALYSIS)))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    # Only the background calls already holding a service slot finish first
+    assert finished.index(ANALYSIS) <= config.llm_preferences_concurrency
+
+def test_rate_limit_tokens_go_to_the_most_urgent_caller():
+    bucket = TokenBucket(1200)
+    bucket._tokens = 0
+    served = []
+
+    async def take(name: str):
+        await bucket.acquire(1, PRIORITY_CLASSES.index(name))
+        served.append(name)
+
+    async def run():
+        tasks = [asyncio.create_task(take(BACKGROUND)) for _ in range(5)]
+        # The interactive caller arrives while the first background caller waits for the refill
+        await asyncio.sleep(0.01)
+        tasks.append(asyncio.create_task(take(INTERACTIVE)))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+    assert served[0] == INTERACTIVE
+    assert bucket.waited_seconds > 0
+
+def test_full_queue_rejects_callers_that_do_not_wait_only():
+    gateway = LLMGateway(Config())
+    gateway._queue_limits[BACKGROUND] = 0
+
+    async def call(wait: bool):
+        async def model_call():
+            return "ok"
+        with request_class(BACKGROUND, wait=wait):
+            return await gateway.run(PREFERENCES, model_call, tokens=100)
+
+    assert asyncio.run(call(wait=True)) == "ok"
+    with pytest.raises(LLMOverloaded):
+        asyncio.run(call(wait=False))
+    counters = gateway.stats()["classes"][BACKGROUND]
+    assert (counters["over_limit"], counters["rejected"]) == (1, 1)
+
+
+def test_chat_burst_leaves_reserved_global_slots_to_other_services():
+    config = Config()
+    gateway = LLMGateway(config)
+    release = asyncio.Event()
+
+    async def chat():
+        async def model_call():
+            await release.wait()
+        with request_class(INTERACTIVE):
+            await gateway.run(DATE_MATE, model_call, tokens=100)
+
+    async def notification():
+        async def model_call():
+            return "ok"
+        with request_class(BACKGROUND):
+            return await gateway.run(NOTIFICATION, model_call, tokens=100)
+
+    async def run():
+        chats = [asyncio.create_task(chat()) for _ in range(config.llm_date_mate_concurrency)]
+        await asyncio.sleep(0.05)
+        held = gateway.stats()["services"][DATE_MATE]["in_flight"]
+        # The background call still gets a global slot while the chat burst holds all it can
+        result = await asyncio.wait_for(notification(), timeout=1)
+        release.set()
+        await asyncio.gather(*chats)
+        return held, result
+
+    held, result = asyncio.run(run())
+
+    assert result == "ok"
+    assert held <= config.llm_max_concurrency - sum(
+        slots for service, slots in gateway.reserved_slots.items() if service != DATE_MATE
+    )
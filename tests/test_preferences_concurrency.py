@@ -0,0 +1,25 @@
+import asyncio
+import time
+import uuid
+
+from com.mhire.app.config.config import Config
+
+def test_simultaneous_analyses_overlap(upstream, fake_openai, app_client):
+    """N analyses for different users take about as long as one model call, not N times as long"""
+    count = Config().llm_preferences_concurrency
+    prefix = uuid.uuid4().hex
+
+    async def run():
+        async with app_client() as client:
+            started = time.perf_counter()
+            responses = await asyncio.gather(*[
+                client.get(f"/api/v1/chats/analyze/{prefix}-{i}") for i in range(count)
+            ])
+            return responses, time.perf_counter() - started
+
+    responses, elapsed = asyncio.run(run())
+
+    assert [response.status_code for response in responses] == [200] * count
+    assert fake_openai.calls == count
+    # Sequential calls would take count * delay
+    assert elapsed < 2 * fake_openai.delay
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from com.mhire.app.services.notification.notification_schema import Quote
+from com.mhire.app.services.notification.quote_store import QuoteStore
+
+def now() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+def test_generated_quotes_do_not_trim_the_daily_quote(tmp_path):
+    store = QuoteStore(str(tmp_path / "quotes.sqlite3"), history_limit=30)
+    daily = store.add(Quote(quote="daily", timestamp=now()), daily=True)
+    for i in range(31):
+        store.add(Quote(quote=f"generated {i}", timestamp=now()))
+
+    day = daily.timestamp[:10]
+    assert store.daily_quote(day) == daily
+    assert store.latest_daily_quote() == daily
+    # A second scheduled quote for the same day is still refused
+    assert store.add(Quote(quote="second daily", timestamp=now()), daily=True) == daily
+
+def test_history_keeps_the_newest_quotes(tmp_path):
+    store = QuoteStore(str(tmp_path / "quotes.sqlite3"), history_limit=5)
+    store.add(Quote(quote="daily", timestamp=now()), daily=True)
+    for i in range(8):
+        store.add(Quote(quote=f"generated {i}", timestamp=now()))
+
+    assert [quote.quote for quote in store.history()] == [f"generated {i}" for i in range(3, 8)]
+    items, total = store.page(3, 10)
+    assert total == 5
+    assert [quote.quote for quote in items] == ["generated 4", "generated 3"]
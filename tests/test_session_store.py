@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from com.mhire.app.services.date_mate.date_mate_errors import SessionConflictError
+from com.mhire.app.services.date_mate.date_mate_schema import ChatState
+from com.mhire.app.services.date_mate.session_store import SQLiteSessionStore
+
+def turn(number: int) -> list:
+    return [
+        {"role": "user", "content": f"question {number}"},
+        {"role": "assistant", "content": f"answer {number}"}
+    ]
+
+def new_session(user_id: str) -> ChatState:
+    return ChatState(messages=[], context={"recent_topics": []}, user_id=user_id)
+
+def test_stale_save_from_another_worker_is_rejected(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    first, second = SQLiteSessionStore(path, 100, 3600), SQLiteSessionStore(path, 100, 3600)
+
+    async def run():
+        await first.save(new_session("u1"))
+        a, b = await first.get("u1"), await second.get("u1")
+        a.messages.extend(turn(1))
+        await first.save(a)
+        b.messages.extend(turn(2))
+        with pytest.raises(SessionConflictError):
+            await second.save(b)
+        return await second.get("u1")
+
+    stored = asyncio.run(run())
+
+    assert stored.messages == turn(1)
+    assert second.stats()["conflicts"] == 1
+
+def test_two_new_sessions_for_one_user_do_not_overwrite_each_other(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    first, second = SQLiteSessionStore(path, 100, 3600), SQLiteSessionStore(path, 100, 3600)
+
+    async def run():
+        await first.save(new_session("u1"))
+        with pytest.raises(SessionConflictError):
+            await second.save(new_session("u1"))
+
+    asyncio.run(run())
+
+def test_conflicting_turn_is_replayed_on_the_latest_session(tmp_path):
+    from com.mhire.app.config.config import Config
+    from com.mhire.app.services.date_mate.date_mate import DateMate
+
+    path = str(tmp_path / "sessions.sqlite3")
+    other_worker = SQLiteSessionStore(path, 100, 3600)
+    date_mate = DateMate(Config())
+    date_mate.session_store = SQLiteSessionStore(path, 100, 3600)
+
+    async def run():
+        state = await date_mate.initialize_chat_state("u1")
+        # Another worker stores a turn while this one waits for the model
+        concurrent = new_session("u1")
+        concurrent.messages.extend(turn(1))
+        await other_worker.save(concurrent)
+        state.messages.extend(turn(2))
+        await date_mate.save_turn(state, 2)
+        return await other_worker.get("u1")
+
+    stored = asyncio.run(run())
+
+    assert stored.messages == turn(1) + turn(2)
+
+def test_size_estimate_counts_converted_messages():
+    from com.mhire.app.services.date_mate.date_mate import DateMate
+    from com.mhire.app.services.date_mate.session_store import estimate_session_bytes
+
+    state = new_session("u1")
+    for number in range(10):
+        state.messages.extend(turn(number))
+    plain = estimate_session_bytes(state)
+    state._langchain_messages.extend(DateMate.to_langchain_messages(state.messages))
+
+    assert estimate_session_bytes(state) >= 2 * plain
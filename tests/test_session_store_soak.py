@@ -0,0 +1,49 @@
+import asyncio
+import gc
+import os
+import tracemalloc
+
+from com.mhire.app.services.date_mate.date_mate_schema import ChatState
+from com.mhire.app.services.date_mate.session_store import InMemorySessionStore
+
+# Distinct users simulated; SOAK_USERS=1000000 runs the full soak (a few minutes)
+SOAK_USERS = int(os.getenv("SOAK_USERS", "50000"))
+MAX_SESSIONS = 5000
+MAX_BYTES = 4 * 1024 * 1024
+
+def session_for(user_id: str) -> ChatState:
+    return ChatState(
+        messages=[
+            {"role": "user", "content": f"Bonjour, je m'appelle {user_id} et je cherche des idées de rendez-vous"},
+            {"role": "assistant", "content": "Bonjour ! Avec plaisir. Qu'aimez-vous faire le week-end ?"}
+        ],
+        context={"recent_topics": ["date", "advice"]},
+        user_id=user_id
+    )
+
+def test_memory_stays_bounded_with_many_distinct_users():
+    store = InMemorySessionStore(max_sessions=MAX_SESSIONS, idle_ttl=86400, max_bytes=MAX_BYTES)
+    checkpoints = {}
+
+    async def run():
+        for i in range(SOAK_USERS):
+            user_id = f"user-{i}"
+            state = await store.get(user_id) or session_for(user_id)
+            await store.save(state)
+            if i + 1 in (SOAK_USERS // 4, SOAK_USERS):
+                gc.collect()
+                checkpoints[i + 1] = tracemalloc.get_traced_memory()[0]
+
+    tracemalloc.start()
+    try:
+        asyncio.run(run())
+    finally:
+        tracemalloc.stop()
+
+    stats = store.stats()
+    assert stats["sessions"] <= MAX_SESSIONS
+    assert stats["estimated_bytes"] <= MAX_BYTES
+    assert sum(stats["evictions"].values()) >= SOAK_USERS - MAX_SESSIONS
+    # Once the store is full, simulating three times as many users adds no memory
+    early, final = checkpoints[SOAK_USERS // 4], checkpoints[SOAK_USERS]
+    assert final < early * 1.1 + 512 * 1024
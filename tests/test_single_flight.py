@@ -0,0 +1,46 @@
+import asyncio
+import uuid
+
+from com.mhire.app.services.preferences.preferences import analysis_flight, fetch_flight
+
+def test_simultaneous_requests_for_one_user_share_one_pipeline(upstream, fake_openai, app_client):
+    """50 concurrent analyses of one user make exactly one upstream call and one model call"""
+    upstream["delay"] = 0.05
+    user_id = uuid.uuid4().hex
+    coalesced_before = analysis_flight.coalesced
+
+    async def run():
+        async with app_client() as client:
+            return await asyncio.gather(*[client.get(f"/api/v1/chats/analyze/{user_id}") for _ in range(50)])
+
+    responses = asyncio.run(run())
+
+    assert [response.status_code for response in responses] == [200] * 50
+    assert len({response.text for response in responses}) == 1
+    assert upstream["calls"] == 1
+    assert fake_openai.calls == 1
+    assert analysis_flight.coalesced - coalesced_before == 49
+    assert fetch_flight.stats()["in_flight"] == 0
+
+def test_on_demand_analysis_does_not_join_a_background_analysis(upstream, fake_openai, fresh_gateway):
+    from com.mhire.app.gateway.llm_gateway import BACKGROUND, request_class
+    from com.mhire.app.services.preferences.preferences import PreferencesService
+
+    user_id = uuid.uuid4().hex
+    coalesced_before = analysis_flight.coalesced
+
+    async def background():
+        with request_class(BACKGROUND, wait=True):
+            return await PreferencesService.analyze_user(user_id, refresh=True)
+
+    async def run():
+        job = asyncio.create_task(background())
+        await asyncio.sleep(0.1)
+        on_demand = await PreferencesService.analyze_user(user_id, refresh=True)
+        return on_demand, await job
+
+    asyncio.run(run())
+
+    classes = fresh_gateway.stats()["classes"]
+    assert analysis_flight.coalesced == coalesced_before
+    assert (classes["background"]["admitted"], classes["analysis"]["admitted"]) == (1, 1)
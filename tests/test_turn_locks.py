@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from com.mhire.app.services.date_mate.turn_locks import TurnLocks, TurnLockTimeout
+
+def test_other_users_never_wait_and_entries_are_dropped():
+    locks = TurnLocks(timeout=0.2)
+
+    async def turn(user_id: str):
+        async with locks.hold(user_id):
+            await asyncio.sleep(0.05)
+
+    async def run():
+        await asyncio.gather(*[turn(f"user-{i}") for i in range(100)])
+
+    asyncio.run(run())
+
+    stats = locks.stats()
+    assert stats["contended"] == 0
+    assert stats["max_active_users"] == 100
+    assert stats["active_users"] == 0
+
+def test_turns_of_one_user_run_one_at_a_time():
+    locks = TurnLocks(timeout=0.05)
+
+    async def run():
+        order = []
+
+        async def turn(name: str, delay: float):
+            async with locks.hold("u1"):
+                order.append(f"{name} start")
+                await asyncio.sleep(delay)
+                order.append(f"{name} end")
+
+        first = asyncio.create_task(turn("first", 0.2))
+        await asyncio.sleep(0)
+        with pytest.raises(TurnLockTimeout):
+            await turn("second", 0)
+        await first
+        return order
+
+    order = asyncio.run(run())
+
+    assert order == ["first start", "first end"]
+    assert locks.stats()["timeouts"] == 1
+    assert locks.stats()["active_users"] == 0